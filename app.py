@@ -3,22 +3,37 @@ import os
 import re
 import base64
 import random
-from io import BytesIO
-from PIL import Image
-from openai import OpenAI
-import google.generativeai as genai
-import anthropic
 from audio_recorder_streamlit import audio_recorder
 
-from config import get_prompt_template, load_env, PromptTemplate
-from src.vectordb_utils import query_pinecone
-from src.conv_db import load_all_sessions, save_session, rename_session, delete_session
+import config
+from config import load_env
+from src.vectordb_utils import warm_up as warm_up_vectordb
+from src.conv_db import (
+    load_session, list_session_summaries, count_sessions, search_sessions,
+    save_session, rename_session, delete_session,
+    put_image, load_image, image_ref_part,
+)
+from src.llm import stream_llm_response, REQUEST_TIMEOUT
+from src.llm_async import run_fan_out
+from src.response_cache import get_response_cache
+from src.prompts import (
+    proposal_context, proposal_content, screening_context_prompt, screening_followup_prompt,
+    linkedin_followup_messages,
+    build_conv_messages, summary_messages, quick_reply_messages,
+    english_rewrite_prompt, english_rewrite_messages,
+)
+from src.image_prep import prepare_upload
+from src.stream_render import StreamRenderer, render_stream
+from src.llm_clients import get_client
+from src import telemetry
 
 # --- Constants ---
 ANTHROPIC_MODELS = ["claude-opus-4-7", "claude-opus-4-6"]
 GOOGLE_MODELS = ["gemini-3.1-pro-preview"]
 OPENAI_MODELS = ["gpt-5.5"]
 RESUMES_DIR = "resumes"
+CONV_SESSIONS_PAGE_SIZE = 20
+COMPARE_GRACE_SECONDS = 60  # stop waiting on other drafts this long after the first finishes
 
 TONE_CATEGORIES = {
     "casual": {
@@ -135,134 +150,6 @@ def _copy_button(text, key):
     </script>
     """, height=40)
 
-def get_image_base64(image_raw):
-    buffered = BytesIO()
-    image_raw.save(buffered, format=image_raw.format)
-    img_byte = buffered.getvalue()
-    return base64.b64encode(img_byte).decode('utf-8')
-
-def base64_to_image(base64_string):
-    base64_string = base64_string.split(",")[1]
-    return Image.open(BytesIO(base64.b64decode(base64_string)))
-
-def messages_to_gemini(messages):
-    gemini_messages = []
-    prev_role = None
-    for message in messages:
-        if prev_role and (prev_role == message["role"]):
-            gemini_message = gemini_messages[-1]
-        else:
-            gemini_message = {
-                "role": "model" if message["role"] == "assistant" else "user",
-                "parts": [],
-            }
-
-        for content in message["content"]:
-            if content["type"] == "text":
-                gemini_message["parts"].append(content["text"])
-            elif content["type"] == "image_url":
-                gemini_message["parts"].append(base64_to_image(content["image_url"]["url"]))
-            elif content["type"] == "video_file":
-                gemini_message["parts"].append(genai.upload_file(content["video_file"]))
-            elif content["type"] == "audio_file":
-                gemini_message["parts"].append(genai.upload_file(content["audio_file"]))
-
-        if prev_role != message["role"]:
-            gemini_messages.append(gemini_message)
-
-        prev_role = message["role"]
-        
-    return gemini_messages
-
-def messages_to_anthropic(messages):
-    anthropic_messages = []
-    prev_role = None
-    for message in messages:
-        if prev_role and (prev_role == message["role"]):
-            anthropic_message = anthropic_messages[-1]
-        else:
-            anthropic_message = {
-                "role": message["role"] ,
-                "content": [],
-            }
-        if message["content"][0]["type"] == "image_url":
-            anthropic_message["content"].append(
-                {
-                    "type": "image",
-                    "source":{   
-                        "type": "base64",
-                        "media_type": message["content"][0]["image_url"]["url"].split(";")[0].split(":")[1],
-                        "data": message["content"][0]["image_url"]["url"].split(",")[1]
-                    }
-                }
-            )
-        else:
-            anthropic_message["content"].append(message["content"][0])
-
-        if prev_role != message["role"]:
-            anthropic_messages.append(anthropic_message)
-
-        prev_role = message["role"]
-        
-    return anthropic_messages
-
-def stream_llm_response(model_params, model_type, api_key, messages):
-    response_message = ""
-    timeout = 300  # 5 minutes timeout
-
-    if model_type == "openai":
-        client = OpenAI(api_key=api_key, timeout=timeout)
-        model_name = model_params.get("model", "gpt-5.5")
-        kwargs = {
-            "model": model_name,
-            "messages": messages,
-            "stream": True,
-        }
-        # GPT-5 family (reasoning models) reject temperature/top_p — omit them.
-        if not model_name.startswith("gpt-5.5"):
-            kwargs["temperature"] = model_params.get("temperature", 0.7)
-        for chunk in client.chat.completions.create(**kwargs):
-            chunk_text = chunk.choices[0].delta.content or ""
-            response_message += chunk_text
-            yield chunk_text
-
-    elif model_type == "google":
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(
-            model_name=model_params["model"],
-            generation_config={
-                "temperature": model_params.get("temperature", 0.7),
-            }
-        )
-        gemini_messages = messages_to_gemini(messages)
-
-        for chunk in model.generate_content(
-            contents=gemini_messages,
-            stream=True,
-            request_options={'timeout': timeout}
-        ):
-            chunk_text = chunk.text or ""
-            response_message += chunk_text
-            yield chunk_text
-
-    elif model_type == "anthropic":
-        client = anthropic.Anthropic(api_key=api_key, timeout=timeout)
-        model_name = model_params.get("model", "claude-opus-4-6")
-        kwargs = {
-            "model": model_name,
-            "messages": messages_to_anthropic(messages),
-            "max_tokens": 4096,
-        }
-        # Claude Opus 4.7+ rejects temperature/top_p/top_k with 400 — omit them.
-        if not model_name.startswith("claude-opus-4-7"):
-            kwargs["temperature"] = model_params.get("temperature", 0.7)
-        with client.messages.stream(**kwargs) as stream:
-            for text in stream.text_stream:
-                response_message += text
-                yield text
-
-    return response_message
-
 # --- State Management ---
 
 def init_session_state():
@@ -272,9 +159,12 @@ def init_session_state():
         st.session_state.prev_speech_hash = None
     if "nav_selection" not in st.session_state:
         st.session_state.nav_selection = "💬 2English"
-    # Upwork Response tab: multiple saved job sessions (loaded from SQLite)
+    # Upwork Response tab: hydrated saved job sessions, loaded from SQLite on demand
+    # (the history list itself only queries id/label summaries)
     if "conv_sessions" not in st.session_state:
-        st.session_state.conv_sessions = load_all_sessions()
+        st.session_state.conv_sessions = {}
+    if "conv_list_limit" not in st.session_state:
+        st.session_state.conv_list_limit = CONV_SESSIONS_PAGE_SIZE
     if "conv_active_id" not in st.session_state:
         st.session_state.conv_active_id = None  # currently active session id
     # Counter used to reset the file uploader widget after each follow-up
@@ -308,7 +198,8 @@ def on_nav_change():
     st.session_state.pop("proposal_followup_history", None)
     for key in ["last_proposal_text", "last_proposal_job_desc",
                 "last_screening_response", "last_screening_questions",
-                "proposal_stage", "last_linkedin_message"]:
+                "proposal_stage", "last_linkedin_message",
+                "proposal_drafts", "proposal_draft_messages", "proposal_draft_job_desc"]:
         st.session_state.pop(key, None)
 
     # Conversation sessions persist across tab switches -- just clear the LLM messages
@@ -316,6 +207,101 @@ def on_nav_change():
 
 # --- Render Functions ---
 
+def _model_type(model):
+    if model.startswith("gpt"): return "openai"
+    if model.startswith("gemini"): return "google"
+    if model.startswith("claude"): return "anthropic"
+    return None
+
+def _available_models(api_keys):
+    return (ANTHROPIC_MODELS if api_keys["anthropic"] else []) + \
+           (GOOGLE_MODELS if api_keys["google"] else []) + \
+           (OPENAI_MODELS if api_keys["openai"] else [])
+
+def _response_cache():
+    return get_response_cache() if st.session_state.get("response_cache_enabled") else None
+
+def _stream_response(model_params, model_type, api_key, messages, cache_breakpoints=False):
+    """
+    stream_llm_response, served from the response cache when it is enabled in
+    the sidebar. Pass `cache_breakpoints` for multi-turn chats.
+    """
+    return stream_llm_response(
+        model_params, model_type, api_key, messages,
+        cache=_response_cache(),
+        on_cache_hit=lambda: st.toast("Cached response", icon="⚡"),
+        on_usage=_record_usage,
+        cache_breakpoints=cache_breakpoints,
+    )
+
+def _stream_into(container, model_params, model_type, api_key, messages, cache_breakpoints=False):
+    """
+    Stream a response into `container`, re-rendering about every 50 ms
+    instead of on every chunk. Returns the full text.
+    """
+    text, stats = render_stream(
+        _stream_response(model_params, model_type, api_key, messages, cache_breakpoints), container.write
+    )
+    st.session_state.last_stream_stats = stats
+    return text
+
+def _record_usage(usage):
+    """Keep the last call's token usage and per-session totals for the sidebar."""
+    st.session_state.last_llm_usage = usage
+    totals = st.session_state.setdefault("llm_usage_totals", {})
+    for field in ("input_tokens", "cache_creation_input_tokens", "cache_read_input_tokens"):
+        totals[field] = totals.get(field, 0) + usage[field]
+
+def _render_stream_stats():
+    stats = st.session_state.get("last_stream_stats")
+    if not stats or not stats["chunks"]:
+        return
+    st.caption(
+        f"Last stream: {stats['chunks']} chunks in {stats['seconds']:.1f}s "
+        f"({stats['chunks_per_sec']:.0f}/s) · {stats['renders']} renders · "
+        f"render overhead {stats['render_seconds'] * 1000:.0f} ms ({stats['render_overhead']:.0%})"
+    )
+
+def _render_prompt_cache_usage():
+    last = st.session_state.get("last_llm_usage")
+    if not last:
+        return
+    totals = st.session_state.llm_usage_totals
+    prompt_tokens = sum(totals.values())
+    st.caption(
+        f"Prompt cache (last call): {last['cache_read_input_tokens']:,} read · "
+        f"{last['cache_creation_input_tokens']:,} written · {last['input_tokens']:,} uncached input tokens  \n"
+        f"Session: {totals['cache_read_input_tokens'] / prompt_tokens:.0%} of "
+        f"{prompt_tokens:,} prompt tokens served from cache"
+        if prompt_tokens else "Prompt cache: no prompt tokens yet"
+    )
+
+def _render_telemetry():
+    with st.expander("⏱️ Latency by stage (24h)"):
+        stats = telemetry.stage_stats()
+        if not stats:
+            st.caption("No requests recorded yet.")
+            return
+        st.dataframe(
+            [
+                {
+                    "stage": row["stage"],
+                    "model": row["model"],
+                    "n": row["count"],
+                    "errors": row["errors"],
+                    "p50 ms": round(row["p50_ms"]),
+                    "p95 ms": round(row["p95_ms"]),
+                    "TTFT p50": round(row["ttft_p50_ms"]) if row["ttft_p50_ms"] is not None else None,
+                    "TTFT p95": round(row["ttft_p95_ms"]) if row["ttft_p95_ms"] is not None else None,
+                    "in tok": row["input_tokens"],
+                    "out tok": row["output_tokens"],
+                }
+                for row in stats
+            ],
+            hide_index=True,
+        )
+        st.button("Clear", key="clear_telemetry", on_click=telemetry.clear)
+
 def render_sidebar():
     with st.sidebar:
         cols_keys = st.columns(2)
@@ -335,21 +321,41 @@ def render_sidebar():
 
         st.divider()
         
-        available_models = [] + (ANTHROPIC_MODELS if anthropic_api_key else []) + \
-                             (GOOGLE_MODELS if google_api_key else []) + \
-                             (OPENAI_MODELS if openai_api_key else [])
+        api_keys = {
+            "openai": openai_api_key,
+            "google": google_api_key,
+            "anthropic": anthropic_api_key
+        }
+        available_models = _available_models(api_keys)
         
         model = st.selectbox("Select a model:", available_models, index=0) if available_models else None
-        
-        model_type = None
-        if model:
-            if model.startswith("gpt"): model_type = "openai"
-            elif model.startswith("gemini"): model_type = "google"
-            elif model.startswith("claude"): model_type = "anthropic"
+        model_type = _model_type(model) if model else None
         
         with st.popover("⚙️ Model parameters"):
             model_temp = st.slider("Temperature", min_value=0.0, max_value=2.0, value=0.7, step=0.1)
 
+        cache_responses = st.toggle(
+            "Cache responses",
+            value=False,
+            key="response_cache_enabled",
+            help="Replay identical requests (same model, parameters and messages) from a local cache for 24 hours.",
+        )
+        if cache_responses:
+            cache_stats = get_response_cache().stats()
+            cols_cache = st.columns([3, 1])
+            with cols_cache[0]:
+                st.caption(
+                    f"⚡ {cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']} hits "
+                    f"({cache_stats['hit_rate']:.0%}) · {cache_stats['entries']} cached · "
+                    f"{cache_stats['bytes'] / 1024:.0f} KB"
+                )
+            with cols_cache[1]:
+                st.button("Clear", key="clear_response_cache", on_click=lambda: get_response_cache().clear())
+
+        _render_prompt_cache_usage()
+        _render_stream_stats()
+        _render_telemetry()
+
         # Resume selector (used by Upwork Proposal tab)
         resume_files = _list_resumes()
         resume_options = ["(none)"] + resume_files
@@ -374,11 +380,7 @@ def render_sidebar():
         st.button("🗑️ Reset conversation", on_click=lambda: st.session_state.pop("messages", None))
         st.divider()
 
-    return {
-        "openai": openai_api_key,
-        "google": google_api_key,
-        "anthropic": anthropic_api_key
-    }, {
+    return api_keys, {
         "model": model,
         "temperature": model_temp
     }, model_type, audio_response, tts_voice, tts_model
@@ -498,16 +500,9 @@ def render_2english(api_keys, model_params, model_type, audio_response, tts_voic
             # final_prompt = prompt or audio_prompt
         final_prompt = prompt
         # 1. Convert user prompt to sentences as if usa native english speakers write/say
-        system_instruction = f"Rewrite the following text to sound natural, {tone['descriptors']}, and native-like (USA English), while preserving the original meaning."
-        full_text_prompt = f"{system_instruction}\n\nInput Text:\n{final_prompt}"
-        
         st.session_state.messages.append({
             "role": "user", 
-            "content": [{"type": "text", "text": full_text_prompt}] # Store the full prompt or just display the original?
-            # Usually better to display the original to the user, but send instructions to LLM.
-            # But to keep it simple and stateless, we'll just append the text.
-            # Let's append the raw text for display, but modify what we send to stream_llm_response if possible.
-            # Since stream_llm_response takes messages directly, we'll just use the prompt text and rely on the instruction being there.
+            "content": [{"type": "text", "text": english_rewrite_prompt(final_prompt, tone)}]
         })
         
         # Only show the user's original text in the chat (hack: replace the last message content for display vs logic)
@@ -525,22 +520,10 @@ def render_2english(api_keys, model_params, model_type, audio_response, tts_voic
             # If we just appended text, we can modify the last message in the list passed to the API
             # without modifying session state (which is used for display).
             
-            api_messages = [m.copy() for m in st.session_state.messages]
-            # Inject instruction into the last text message if it's user
-            if api_messages and api_messages[-1]["role"] == "user":
-                last_content = api_messages[-1]["content"]
-                for item in last_content:
-                    if item["type"] == "text":
-                        # Prepend instruction
-                         item["text"] = f"You are a native USA English speaker helper. Rewrite this to sound {tone['descriptors']} and native-like:\n\n{item['text']}"
+            api_messages = english_rewrite_messages(st.session_state.messages, tone)
             
-            response_text = ""
             response_container = st.empty()
-            
-            # Stream
-            for chunk in stream_llm_response(model_params, model_type, api_keys[model_type], api_messages):
-                response_text += chunk
-                response_container.write(response_text)
+            response_text = _stream_into(response_container, model_params, model_type, api_keys[model_type], api_messages)
             
             _copy_button(response_text, "copy_2eng_live")
 
@@ -552,7 +535,7 @@ def render_2english(api_keys, model_params, model_type, audio_response, tts_voic
 
         # Audio Response
         if audio_response and response_text:
-            client = OpenAI(api_key=api_keys["openai"])
+            client = get_client("openai", api_keys["openai"], REQUEST_TIMEOUT)
             response = client.audio.speech.create(
                 model=tts_model,
                 voice=tts_voice,
@@ -562,15 +545,30 @@ def render_2english(api_keys, model_params, model_type, audio_response, tts_voic
             st.html(f"""<audio controls autoplay><source src="data:audio/wav;base64,{audio_base64}" type="audio/mp3"></audio>""")
 
 def _build_image_content(uploaded_images):
-    """Convert uploaded image files into message content parts for the LLM."""
+    """
+    Store uploaded image files in the image store (normalized by
+    prepare_upload) and return image_ref content parts for the LLM (resolved
+    to provider-sized data URLs by stream_llm_response).
+    """
     image_parts = []
     for img_file in uploaded_images:
-        raw_img = Image.open(img_file)
-        img_b64 = get_image_base64(raw_img)
-        img_type = img_file.type or "image/png"
+        mime, data = prepare_upload(img_file.getvalue(), img_file.type or "image/png")
+        ref = put_image(data, mime)
+        image_parts.append(image_ref_part(ref))
+    return image_parts
+
+def _inline_image_content(uploaded_images):
+    """
+    Image content parts carrying in-memory data URLs (normalized by
+    prepare_upload), for proposal requests whose images are not kept in the
+    image store.
+    """
+    image_parts = []
+    for img_file in uploaded_images:
+        mime, data = prepare_upload(img_file.getvalue(), img_file.type or "image/png")
         image_parts.append({
             "type": "image_url",
-            "image_url": {"url": f"data:{img_type};base64,{img_b64}"}
+            "image_url": {"url": f"data:{mime};base64,{base64.b64encode(data).decode('utf-8')}"},
         })
     return image_parts
 
@@ -580,16 +578,9 @@ def _render_linkedin_followup_button(api_keys, model_params, model_type, key_suf
         proposal = st.session_state.get("last_proposal_text", "")
         job_desc = st.session_state.get("last_proposal_job_desc", "")
         if proposal and job_desc:
-            prompt = get_prompt_template(PromptTemplate.LINKEDIN_FOLLOWUP).format(
-                job_description=job_desc,
-                proposal=proposal,
-            )
-            msg = [{"role": "user", "content": [{"type": "text", "text": prompt}]}]
-            response_text = ""
+            msg = linkedin_followup_messages(job_desc, proposal)
             container = st.empty()
-            for chunk in stream_llm_response(model_params, model_type, api_keys[model_type], msg):
-                response_text += chunk
-                container.write(response_text)
+            response_text = _stream_into(container, model_params, model_type, api_keys[model_type], msg)
             container.empty()
             st.session_state.last_linkedin_message = response_text
             st.rerun()
@@ -601,6 +592,148 @@ def _render_linkedin_followup_button(api_keys, model_params, model_type, key_suf
             _copy_button(st.session_state.last_linkedin_message, f"copy_linkedin_{key_suffix}")
 
 
+def _generate_proposal_drafts(api_keys, model_params, models, user_content, job_description):
+    """Stream the same proposal prompt through several models at once, one column each."""
+    messages = [{"role": "user", "content": user_content}]
+    jobs = [{
+        "key": model,
+        "model_params": {**model_params, "model": model},
+        "model_type": _model_type(model),
+        "api_key": api_keys[_model_type(model)],
+        "messages": messages,
+        "cache": _response_cache(),
+    } for model in models]
+
+    containers, renderers = {}, {}
+    for col, model in zip(st.columns(len(models)), models):
+        with col:
+            st.markdown(f"**{model}**")
+            containers[model] = st.empty()
+            renderers[model] = StreamRenderer(containers[model].write)
+
+    results = run_fan_out(
+        jobs,
+        on_chunk=lambda model, chunk, text: renderers[model].feed(chunk),
+        grace=COMPARE_GRACE_SECONDS,
+    )
+    for renderer in renderers.values():
+        renderer.finish()
+    for container in containers.values():
+        container.empty()
+
+    st.session_state.proposal_drafts = {
+        model: {
+            "text": result["text"],
+            "status": result["status"],
+            "seconds": result["seconds"],
+            "error": str(result["error"]) if result["error"] else None,
+            "cached": result["cached"],
+        }
+        for model, result in results.items()
+    }
+    st.session_state.proposal_draft_messages = messages
+    st.session_state.proposal_draft_job_desc = job_description
+    for key in ["last_proposal_text", "last_screening_response", "last_linkedin_message"]:
+        st.session_state.pop(key, None)
+    st.session_state.proposal_stage = None
+
+def _render_proposal_drafts(api_keys, model_params, screening_questions):
+    """Show the side-by-side drafts with a button to continue with each."""
+    drafts = st.session_state.proposal_drafts
+    st.divider()
+    st.markdown("##### Drafts")
+    for col, (model, draft) in zip(st.columns(len(drafts)), drafts.items()):
+        with col:
+            st.markdown(f"**{model}**")
+            if draft["status"] == "done":
+                st.caption(f"Finished in {draft['seconds']:.1f}s" + (" · ⚡ cached" if draft["cached"] else ""))
+            elif draft["status"] == "cancelled":
+                st.caption(f"Stopped after {draft['seconds']:.1f}s ({COMPARE_GRACE_SECONDS}s after the first draft finished)")
+            else:
+                st.caption(f"Failed: {draft['error']}")
+            st.markdown(draft["text"])
+            if draft["text"] and st.button("Use this draft", key=f"use_draft_{model}"):
+                st.session_state.messages = list(st.session_state.proposal_draft_messages)
+                draft_params = {**model_params, "model": model}
+                draft_type = _model_type(model)
+                _accept_proposal(
+                    api_keys, draft_params, draft_type, draft["text"],
+                    st.session_state.proposal_draft_job_desc, screening_questions,
+                )
+                st.rerun()
+
+def _generate_proposal_with_screening(api_keys, model_params, model_type, user_content, screening_prompt,
+                                      job_description, screening_questions):
+    """
+    Stream the proposal and the screening answers side by side. The screening
+    call gets the shared job/resume/experience context as text, so it neither
+    waits for the proposal nor re-sends it and the images.
+    """
+    proposal_messages = [{"role": "user", "content": user_content}]
+    screening_messages = [{"role": "user", "content": [{"type": "text", "text": screening_prompt}]}]
+    jobs = [
+        {"key": key, "model_params": model_params, "model_type": model_type,
+         "api_key": api_keys[model_type], "messages": messages, "cache": _response_cache()}
+        for key, messages in (("proposal", proposal_messages), ("screening", screening_messages))
+    ]
+
+    containers, renderers = {}, {}
+    for col, (key, title) in zip(st.columns(2), (("proposal", "Proposal"), ("screening", "Screening Answers"))):
+        with col:
+            st.markdown(f"##### {title}")
+            containers[key] = st.empty()
+            renderers[key] = StreamRenderer(containers[key].write)
+
+    results = run_fan_out(jobs, on_chunk=lambda key, chunk, text: renderers[key].feed(chunk))
+    for renderer in renderers.values():
+        renderer.finish()
+    st.session_state.last_stream_stats = renderers["proposal"].stats()
+    for container in containers.values():
+        container.empty()
+    for result in results.values():
+        if result["error"]:
+            raise result["error"]
+    if any(result["cached"] for result in results.values()):
+        st.toast("Cached response", icon="⚡")
+
+    st.session_state.messages = proposal_messages
+    _accept_proposal(
+        api_keys, model_params, model_type, results["proposal"]["text"], job_description,
+        screening_questions, screening_response=results["screening"]["text"],
+    )
+
+def _accept_proposal(api_keys, model_params, model_type, response_text, job_description, screening_questions,
+                     screening_response=None):
+    """
+    Record a generated proposal, answer any screening questions (unless
+    `screening_response` was already generated) and start the review stage.
+    """
+    st.session_state.messages.append({"role": "assistant", "content": [{"type": "text", "text": response_text}]})
+    st.session_state.last_proposal_text = response_text
+    st.session_state.last_proposal_job_desc = job_description
+
+    if screening_questions:
+        # kept in the conversation in follow-up form so feedback turns see both answers
+        sq_prompt = screening_followup_prompt(screening_questions)
+        st.session_state.messages.append({"role": "user", "content": [{"type": "text", "text": sq_prompt}]})
+
+        sq_response = screening_response
+        if sq_response is None:
+            sq_container = st.empty()
+            sq_response = _stream_into(sq_container, model_params, model_type, api_keys[model_type], st.session_state.messages,
+                                       cache_breakpoints=True)
+            sq_container.empty()
+
+        st.session_state.messages.append({"role": "assistant", "content": [{"type": "text", "text": sq_response}]})
+        st.session_state.last_screening_response = sq_response
+        st.session_state.last_screening_questions = screening_questions
+
+    st.session_state.proposal_followup_history = []
+    st.session_state.proposal_stage = "reviewing"
+    for key in ["last_linkedin_message", "proposal_drafts", "proposal_draft_messages", "proposal_draft_job_desc"]:
+        st.session_state.pop(key, None)
+
+
 def render_upwork_proposal(api_keys, model_params, model_type, *args):
     job_description = st.text_area("Job Description *", height=200, key="upwork_job_description", placeholder="Paste the job description here...")
     screening_questions = st.text_area("Screening Questions (Optional)", height=150, key="screening_questions", placeholder="Paste any screening questions here...")
@@ -620,6 +753,20 @@ def render_upwork_proposal(api_keys, model_params, model_type, *args):
             with cols[idx % len(cols)]:
                 st.image(img_file.read(), caption=img_file.name, use_container_width=True)
 
+    compare_models = st.multiselect(
+        "Compare models (optional)",
+        _available_models(api_keys),
+        key="proposal_compare_models",
+        help="Draft the proposal with several models at once, side by side, then pick one to continue with.",
+    )
+    parallel_screening = st.toggle(
+        "Answer screening questions in parallel",
+        value=True,
+        key="proposal_parallel_screening",
+        help="Answer the screening questions from the job, resume and experience context at the same time as the "
+             "proposal is written, instead of afterwards as a follow-up to it.",
+    )
+
     # --- Section A: Generate Proposal button ---
     if st.button("Generate Proposal", type="primary"):
         if not job_description:
@@ -629,48 +776,30 @@ def render_upwork_proposal(api_keys, model_params, model_type, *args):
         with st.spinner("Generating proposal..."):
             selected_resume = st.session_state.get("selected_resume", "(none)")
             resume_text = _read_resume(selected_resume) if selected_resume and selected_resume != "(none)" else ""
-            prompt = get_prompt_template(PromptTemplate.GENERATE).format(
-                experience=query_pinecone(job_description),
-                job_description=job_description,
-                important_points=important_points,
-                resume=resume_text or "(no resume provided)",
+            shared_context = proposal_context(job_description, important_points, resume_text)
+            user_content = proposal_content(
+                shared_context, _inline_image_content(uploaded_images) if uploaded_images else ()
             )
 
-            user_content = [{"type": "text", "text": prompt}]
-            if uploaded_images:
-                user_content.extend(_build_image_content(uploaded_images))
-
-            st.session_state.messages = [{"role": "user", "content": user_content}]
-
-            response_text = ""
-            container = st.empty()
-            for chunk in stream_llm_response(model_params, model_type, api_keys[model_type], st.session_state.messages):
-                response_text += chunk
-                container.write(response_text)
-            container.empty()
-
-            st.session_state.messages.append({"role": "assistant", "content": [{"type": "text", "text": response_text}]})
-            st.session_state.last_proposal_text = response_text
-            st.session_state.last_proposal_job_desc = job_description
-
-            if screening_questions:
-                sq_prompt = get_prompt_template(PromptTemplate.UPWORK_SCREENING_QUESTIONS).format(screening_questions=screening_questions)
-                st.session_state.messages.append({"role": "user", "content": [{"type": "text", "text": sq_prompt}]})
+            if len(compare_models) > 1:
+                _generate_proposal_drafts(api_keys, model_params, compare_models, user_content, job_description)
+            elif screening_questions and parallel_screening:
+                _generate_proposal_with_screening(
+                    api_keys, model_params, model_type, user_content,
+                    screening_context_prompt(shared_context, screening_questions),
+                    job_description, screening_questions,
+                )
+            else:
+                st.session_state.messages = [{"role": "user", "content": user_content}]
 
-                sq_response = ""
-                sq_container = st.empty()
-                for chunk in stream_llm_response(model_params, model_type, api_keys[model_type], st.session_state.messages):
-                    sq_response += chunk
-                    sq_container.write(sq_response)
-                sq_container.empty()
+                container = st.empty()
+                response_text = _stream_into(container, model_params, model_type, api_keys[model_type], st.session_state.messages)
+                container.empty()
 
-                st.session_state.messages.append({"role": "assistant", "content": [{"type": "text", "text": sq_response}]})
-                st.session_state.last_screening_response = sq_response
-                st.session_state.last_screening_questions = screening_questions
+                _accept_proposal(api_keys, model_params, model_type, response_text, job_description, screening_questions)
 
-            st.session_state.proposal_followup_history = []
-            st.session_state.proposal_stage = "reviewing"
-            st.session_state.pop("last_linkedin_message", None)
+    if st.session_state.get("proposal_drafts"):
+        _render_proposal_drafts(api_keys, model_params, screening_questions)
 
     # --- Section B: Always-visible proposal + screening display ---
     if st.session_state.get("last_proposal_text"):
@@ -714,11 +843,9 @@ def render_upwork_proposal(api_keys, model_params, model_type, *args):
                 )
                 st.session_state.messages.append({"role": "user", "content": [{"type": "text", "text": user_prompt}]})
 
-                response_text = ""
                 container = st.empty()
-                for chunk in stream_llm_response(model_params, model_type, api_keys[model_type], st.session_state.messages):
-                    response_text += chunk
-                    container.write(response_text)
+                response_text = _stream_into(container, model_params, model_type, api_keys[model_type], st.session_state.messages,
+                                             cache_breakpoints=True)
                 container.empty()
 
                 st.session_state.messages.append({"role": "assistant", "content": [{"type": "text", "text": response_text}]})
@@ -727,14 +854,12 @@ def render_upwork_proposal(api_keys, model_params, model_type, *args):
                 # Also regenerate screening if applicable
                 stored_sq = st.session_state.get("last_screening_questions", "")
                 if stored_sq:
-                    sq_prompt = get_prompt_template(PromptTemplate.UPWORK_SCREENING_QUESTIONS).format(screening_questions=stored_sq)
+                    sq_prompt = screening_followup_prompt(stored_sq)
                     st.session_state.messages.append({"role": "user", "content": [{"type": "text", "text": sq_prompt}]})
 
-                    sq_response = ""
                     sq_container = st.empty()
-                    for chunk in stream_llm_response(model_params, model_type, api_keys[model_type], st.session_state.messages):
-                        sq_response += chunk
-                        sq_container.write(sq_response)
+                    sq_response = _stream_into(sq_container, model_params, model_type, api_keys[model_type], st.session_state.messages,
+                                               cache_breakpoints=True)
                     sq_container.empty()
 
                     st.session_state.messages.append({"role": "assistant", "content": [{"type": "text", "text": sq_response}]})
@@ -750,11 +875,9 @@ def render_upwork_proposal(api_keys, model_params, model_type, *args):
                 st.session_state.messages.append({"role": "user", "content": [{"type": "text", "text": qa_prompt}]})
                 st.session_state.proposal_followup_history.append({"role": "user", "text": followup_msg})
 
-                response_text = ""
                 container = st.empty()
-                for chunk in stream_llm_response(model_params, model_type, api_keys[model_type], st.session_state.messages):
-                    response_text += chunk
-                    container.write(response_text)
+                response_text = _stream_into(container, model_params, model_type, api_keys[model_type], st.session_state.messages,
+                                             cache_breakpoints=True)
                 container.empty()
 
                 st.session_state.messages.append({"role": "assistant", "content": [{"type": "text", "text": response_text}]})
@@ -780,11 +903,9 @@ def render_upwork_proposal(api_keys, model_params, model_type, *args):
             st.session_state.messages.append({"role": "user", "content": [{"type": "text", "text": qa_prompt}]})
             st.session_state.proposal_followup_history.append({"role": "user", "text": followup_msg})
 
-            response_text = ""
             container = st.empty()
-            for chunk in stream_llm_response(model_params, model_type, api_keys[model_type], st.session_state.messages):
-                response_text += chunk
-                container.write(response_text)
+            response_text = _stream_into(container, model_params, model_type, api_keys[model_type], st.session_state.messages,
+                                         cache_breakpoints=True)
             container.empty()
 
             st.session_state.messages.append({"role": "assistant", "content": [{"type": "text", "text": response_text}]})
@@ -792,56 +913,27 @@ def render_upwork_proposal(api_keys, model_params, model_type, *args):
             st.rerun()
 
 
-def _build_conv_messages(context, new_client_content=None):
-    """
-    Build proper multi-turn LLM messages for follow-up conversation.
-
-    Structure:
-      1. user: system prompt with job context + original conversation history
-      2. assistant: first generated response
-      3. user: client's follow-up message (may include images)
-      4. assistant: our drafted reply
-      ... and so on for each follow-up exchange.
-      Last: user message with the new client message (if provided).
-
-    This gives the LLM natural turn-taking instead of one giant prompt.
-    """
-    # First message: the system context prompt (same as initial generation)
-    system_prompt = get_prompt_template(PromptTemplate.CONVERSATION_RESPONSE).format(
-        job_description=context["job_description"],
-        cover_letter=context["cover_letter"],
-        conversation=context["conversation"],
-    )
-    screening_qa = context.get("screening_qa", "").strip()
-    if screening_qa:
-        system_prompt += f"\n\n**Screening Questions & My Answers:**\n{screening_qa}"
-    messages = [
-        {"role": "user", "content": [{"type": "text", "text": system_prompt}]}
-    ]
-
-    # Replay the accumulated follow-up exchanges as proper turns
-    for entry in context["chat_history"]:
-        if entry["role"] == "client":
-            content = []
-            if entry.get("image_parts"):
-                content.extend(entry["image_parts"])
-            content.append({"type": "text", "text": entry["text"]})
-            messages.append({"role": "user", "content": content})
-        else:  # assistant
-            messages.append({"role": "assistant", "content": [{"type": "text", "text": entry["text"]}]})
-
-    # Append the new client message if provided
-    if new_client_content is not None:
-        messages.append({"role": "user", "content": new_client_content})
-
-    return messages
+def _conv_summarizer(model_params, model_type, api_key):
+    """Summarize callback for build_conv_messages, using the selected model."""
+    def summarize(previous_summary, turns):
+        with st.spinner("Summarizing earlier messages..."):
+            return "".join(_stream_response(
+                model_params, model_type, api_key, summary_messages(previous_summary, turns)
+            ))
+    return summarize
 
 def _get_active_session():
-    """Return the active session dict, or None."""
+    """Return the active session dict, loading its body from the DB on first use, or None."""
     sid = st.session_state.conv_active_id
-    if sid and sid in st.session_state.conv_sessions:
-        return st.session_state.conv_sessions[sid]
-    return None
+    if not sid:
+        return None
+    if sid not in st.session_state.conv_sessions:
+        sess = load_session(sid)
+        if sess is None:
+            return None
+        # only keep the active session's body in memory
+        st.session_state.conv_sessions = {sid: sess}
+    return st.session_state.conv_sessions[sid]
 
 def _save_active_session(context, chat_history):
     """Save context and chat_history into the active session."""
@@ -855,9 +947,29 @@ def _create_session_label(job_description):
     text = job_description.strip().replace("\n", " ")
     return text[:50] + ("..." if len(text) > 50 else "")
 
+def _render_conv_search_results(search_text, active_id):
+    """Ranked full-text matches with snippets; clicking one opens the session."""
+    results = search_sessions(search_text)
+    if not results:
+        st.caption("No matches.")
+        return
+    for result in results:
+        sid = result["id"]
+        is_active = sid == active_id
+        if st.button(
+            ("▶ " if is_active else "") + result["label"],
+            key=f"conv_search_{sid}",
+            use_container_width=True,
+            type="primary" if is_active else "secondary",
+        ):
+            if not is_active:
+                st.session_state.conv_active_id = sid
+                st.session_state.messages = []
+                st.rerun()
+        st.caption(result["snippet"])
+
 def _render_conv_right_panel():
-    """Right panel: previous conversations list."""
-    sessions = st.session_state.conv_sessions
+    """Right panel: previous conversations list (summaries only, paged)."""
     active_id = st.session_state.conv_active_id
 
     st.markdown("##### History")
@@ -868,20 +980,33 @@ def _render_conv_right_panel():
         st.session_state.messages = []
         st.rerun()
 
-    if not sessions:
+    search_text = st.text_input(
+        "Search",
+        key="conv_search",
+        placeholder="🔍 Search conversations...",
+        label_visibility="collapsed",
+    )
+    if search_text.strip():
+        _render_conv_search_results(search_text, active_id)
+        return
+
+    summaries = list_session_summaries(limit=st.session_state.conv_list_limit)
+    if not summaries:
         st.caption("No conversations yet.")
         return
 
-    for sid, sess in sessions.items():
+    for summary in summaries:
+        sid = summary["id"]
         is_active = sid == active_id
         col_btn, col_edit, col_del = st.columns([5, 1, 1])
         with col_btn:
-            label = ("▶ " if is_active else "") + sess["label"]
+            label = ("▶ " if is_active else "") + summary["label"]
             if st.button(
                 label,
                 key=f"conv_sess_{sid}",
                 use_container_width=True,
                 type="primary" if is_active else "secondary",
+                help=f"Last updated {summary['updated_at']}",
             ):
                 if not is_active:
                     st.session_state.conv_active_id = sid
@@ -891,25 +1016,31 @@ def _render_conv_right_panel():
             with st.popover("✏️"):
                 new_label = st.text_input(
                     "Rename",
-                    value=sess["label"],
+                    value=summary["label"],
                     key=f"conv_rename_{sid}",
                     label_visibility="collapsed",
                 )
                 if st.button("Save", key=f"conv_rename_save_{sid}"):
                     new_label = new_label.strip()
-                    if new_label and new_label != sess["label"]:
-                        sess["label"] = new_label
+                    if new_label and new_label != summary["label"]:
+                        if sid in st.session_state.conv_sessions:
+                            st.session_state.conv_sessions[sid]["label"] = new_label
                         rename_session(sid, new_label)
                         st.rerun()
         with col_del:
             if st.button("🗑️", key=f"conv_del_{sid}"):
                 delete_session(sid)
-                del st.session_state.conv_sessions[sid]
+                st.session_state.conv_sessions.pop(sid, None)
                 if active_id == sid:
                     st.session_state.conv_active_id = None
                 st.session_state.messages = []
                 st.rerun()
 
+    if len(summaries) < count_sessions():
+        if st.button("Load more", key="conv_load_more", use_container_width=True):
+            st.session_state.conv_list_limit += CONV_SESSIONS_PAGE_SIZE
+            st.rerun()
+
 
 def _render_conv_main_panel(api_keys, model_params, model_type):
     """Left/main panel: new conversation form + active chat."""
@@ -949,6 +1080,7 @@ def _render_conv_main_panel(api_keys, model_params, model_type):
             "chat_history": [],
         }
 
+        st.session_state.conv_sessions = {}
         st.session_state.conv_sessions[new_id] = {
             "label": _create_session_label(job_description),
             "context": context,
@@ -958,15 +1090,13 @@ def _render_conv_main_panel(api_keys, model_params, model_type):
         st.session_state.messages = []
 
         with st.spinner("Generating response..."):
-            api_messages = _build_conv_messages(context)
+            api_messages = build_conv_messages(context)
             st.session_state.messages = api_messages
 
             with st.chat_message("assistant"):
-                response_text = ""
                 response_container = st.empty()
-                for chunk in stream_llm_response(model_params, model_type, api_keys[model_type], st.session_state.messages):
-                    response_text += chunk
-                    response_container.write(response_text)
+                response_text = _stream_into(response_container, model_params, model_type, api_keys[model_type], st.session_state.messages,
+                                             cache_breakpoints=True)
 
                 _copy_button(response_text, "copy_conv_initial")
 
@@ -988,9 +1118,9 @@ def _render_conv_main_panel(api_keys, model_params, model_type):
                     st.markdown(entry["text"])
                     if entry.get("images"):
                         img_cols = st.columns(min(len(entry["images"]), 4))
-                        for i, img_url in enumerate(entry["images"]):
+                        for i, img_ref in enumerate(entry["images"]):
                             with img_cols[i % len(img_cols)]:
-                                st.image(img_url, use_container_width=True)
+                                st.image(load_image(img_ref)[1], use_container_width=True)
             else:
                 with st.chat_message("assistant"):
                     st.markdown(entry["text"])
@@ -1044,15 +1174,16 @@ def _render_conv_main_panel(api_keys, model_params, model_type):
                     "Please regenerate your draft reply incorporating this feedback."
                 )
                 feedback_content = [{"type": "text", "text": feedback_prompt}]
-                api_messages = _build_conv_messages(context, new_client_content=feedback_content)
+                api_messages = build_conv_messages(
+                    context, new_client_content=feedback_content, model_type=model_type,
+                    summarize=_conv_summarizer(model_params, model_type, api_keys[model_type]),
+                )
                 st.session_state.messages = api_messages
 
                 with st.chat_message("assistant"):
-                    response_text = ""
                     response_container = st.empty()
-                    for chunk in stream_llm_response(model_params, model_type, api_keys[model_type], st.session_state.messages):
-                        response_text += chunk
-                        response_container.write(response_text)
+                    response_text = _stream_into(response_container, model_params, model_type, api_keys[model_type], st.session_state.messages,
+                                                 cache_breakpoints=True)
                     _copy_button(response_text, "copy_conv_regen")
 
                 # Replace the last assistant entry with the revised one
@@ -1066,26 +1197,26 @@ def _render_conv_main_panel(api_keys, model_params, model_type):
             else:
                 # --- Good: new client message (normal turn) ---
                 image_content_parts = []
-                image_urls_for_display = []
+                image_refs_for_display = []
                 if uploaded_images:
                     image_content_parts = _build_image_content(uploaded_images)
-                    image_urls_for_display = [p["image_url"]["url"] for p in image_content_parts]
+                    image_refs_for_display = [p["image_ref"] for p in image_content_parts]
 
                 with st.chat_message("user"):
                     st.markdown(user_input)
-                    if image_urls_for_display:
-                        img_cols = st.columns(min(len(image_urls_for_display), 4))
-                        for i, img_url in enumerate(image_urls_for_display):
+                    if image_refs_for_display:
+                        img_cols = st.columns(min(len(image_refs_for_display), 4))
+                        for i, img_ref in enumerate(image_refs_for_display):
                             with img_cols[i % len(img_cols)]:
-                                st.image(img_url, use_container_width=True)
+                                st.image(load_image(img_ref)[1], use_container_width=True)
 
                 msg_text = user_input
                 if uploaded_images:
                     msg_text += "\n\n(The client attached images above. Reference any relevant details in your response.)"
 
                 chat_display_entry = {"role": "client", "text": user_input}
-                if image_urls_for_display:
-                    chat_display_entry["images"] = image_urls_for_display
+                if image_refs_for_display:
+                    chat_display_entry["images"] = image_refs_for_display
                 active_session["chat_history"].append(chat_display_entry)
 
                 context_entry = {"role": "client", "text": msg_text}
@@ -1093,15 +1224,16 @@ def _render_conv_main_panel(api_keys, model_params, model_type):
                     context_entry["image_parts"] = image_content_parts
                 context["chat_history"].append(context_entry)
 
-                api_messages = _build_conv_messages(context)
+                api_messages = build_conv_messages(
+                    context, model_type=model_type,
+                    summarize=_conv_summarizer(model_params, model_type, api_keys[model_type]),
+                )
                 st.session_state.messages = api_messages
 
                 with st.chat_message("assistant"):
-                    response_text = ""
                     response_container = st.empty()
-                    for chunk in stream_llm_response(model_params, model_type, api_keys[model_type], st.session_state.messages):
-                        response_text += chunk
-                        response_container.write(response_text)
+                    response_text = _stream_into(response_container, model_params, model_type, api_keys[model_type], st.session_state.messages,
+                                                 cache_breakpoints=True)
                     _copy_button(response_text, "copy_conv_live")
 
                 active_session["chat_history"].append({"role": "assistant", "text": response_text})
@@ -1158,27 +1290,11 @@ def render_quick_reply(api_keys, model_params, model_type, *args):
             st.error("Please fill in both fields")
             return
 
-        st.session_state.messages = []
-
-        prompt = get_prompt_template(PromptTemplate.QUICK_REPLY).format(
-            client_message=client_message,
-            reply_context=reply_context,
-            tone_instruction=tone["instruction"],
-        )
-
-        st.session_state.messages.append({
-            "role": "user",
-            "content": [{"type": "text", "text": prompt}],
-        })
+        st.session_state.messages = quick_reply_messages(client_message, reply_context, tone)
 
         with st.chat_message("assistant"):
-            response_text = ""
             response_container = st.empty()
-            for chunk in stream_llm_response(
-                model_params, model_type, api_keys[model_type], st.session_state.messages
-            ):
-                response_text += chunk
-                response_container.write(response_text)
+            response_text = _stream_into(response_container, model_params, model_type, api_keys[model_type], st.session_state.messages)
 
             _copy_button(response_text, "copy_qr_live")
 
@@ -1193,6 +1309,9 @@ def render_quick_reply(api_keys, model_params, model_type, *args):
 def main():
     st.set_page_config(page_title="The Chai-Chat", page_icon="🤖", layout="wide", initial_sidebar_state="expanded")
     load_env()
+    config.load_templates()  # validates placeholders on first run; no-op afterwards
+    if config.VECTOR_DB_WARMUP:
+        warm_up_vectordb()
     init_session_state()
 
     st.html("""<h1 style="text-align: center; color: #6ca395;">🤖 <i>The Chai-Chat</i> 💬</h1>""")
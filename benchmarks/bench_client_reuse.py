@@ -0,0 +1,80 @@
+"""
+Time-to-first-token with and without provider client reuse.
+
+Streams repeated requests through `src.llm.stream_llm_response` against the
+local mock server, once building a fresh SDK client per call (the old
+behaviour) and once through the `src.llm_clients` cache.
+
+    python -m benchmarks.bench_client_reuse --requests 20 --connect-delay 0.06
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks.mock_llm_server import MockLLMServer
+from src import llm_clients, telemetry
+from src.llm import stream_llm_response
+
+MESSAGES = [{"role": "user", "content": [{"type": "text", "text": "Write a proposal."}]}]
+MODELS = {"openai": "gpt-5.5", "anthropic": "claude-opus-4-7"}
+
+
+def _factories(base_url):
+    from openai import OpenAI
+    import anthropic
+    return {
+        "openai": lambda key, timeout: OpenAI(api_key=key, timeout=timeout, base_url=base_url + "/v1"),
+        "anthropic": lambda key, timeout: anthropic.Anthropic(api_key=key, timeout=timeout, base_url=base_url),
+    }
+
+
+def _measure(provider, requests):
+    ttfts, totals = [], []
+    for _ in range(requests):
+        start = time.perf_counter()
+        first = None
+        for chunk in stream_llm_response({"model": MODELS[provider]}, provider, "sk-mock", MESSAGES):
+            if first is None and chunk:
+                first = time.perf_counter() - start
+        totals.append((time.perf_counter() - start) * 1000)
+        ttfts.append(first * 1000)
+    return ttfts, totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--connect-delay", type=float, default=0.06, help="simulated handshake cost per connection (s)")
+    parser.add_argument("--first-token-delay", type=float, default=0.02)
+    parser.add_argument("--providers", nargs="+", default=["openai", "anthropic"])
+    args = parser.parse_args()
+
+    original_factories = dict(llm_clients.CLIENT_FACTORIES)
+    original_get_client = llm_clients.get_client
+
+    def fresh_client(provider, api_key, timeout):
+        return llm_clients.CLIENT_FACTORIES[provider](api_key, timeout)
+
+    telemetry.ENABLED = False  # keep bench spans out of the app's metrics.db
+    print(f"{'provider':<10} {'mode':<12} {'ttft p50':>9} {'ttft mean':>10} {'total p50':>10} {'connections':>12}")
+    for provider in args.providers:
+        for mode in ("new client", "pooled"):
+            with MockLLMServer(connect_delay=args.connect_delay, first_token_delay=args.first_token_delay) as server:
+                llm_clients.CLIENT_FACTORIES.update(_factories(server.url))
+                llm_clients.get_client = fresh_client if mode == "new client" else original_get_client
+                try:
+                    ttfts, totals = _measure(provider, args.requests)
+                finally:
+                    llm_clients.get_client = original_get_client
+                    llm_clients.CLIENT_FACTORIES.clear()
+                    llm_clients.CLIENT_FACTORIES.update(original_factories)
+                    llm_clients.close_all()
+                print(
+                    f"{provider:<10} {mode:<12} {statistics.median(ttfts):>7.1f}ms {statistics.fmean(ttfts):>8.1f}ms "
+                    f"{statistics.median(totals):>8.1f}ms {server.connections:>12}"
+                )
+
+
+if __name__ == "__main__":
+    main()
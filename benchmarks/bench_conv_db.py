@@ -0,0 +1,98 @@
+"""
+Per-operation latency of src/conv_db against a scratch database.
+
+Compares the pooled connection manager with the previous behaviour (fresh
+sqlite3.connect, WAL pragma and schema check on every call, then close),
+which is emulated by swapping conv_db._connection for the duration of a run.
+
+    python -m benchmarks.bench_conv_db --sessions 200 --turns 20
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+from src import conv_db, telemetry
+
+
+@contextmanager
+def _connect_per_call():
+    conn = sqlite3.connect(conv_db.DB_PATH)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.execute("PRAGMA user_version").fetchone()
+    for statement in conv_db._SCHEMA:
+        conn.execute(statement)
+    conn.commit()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def _timed(samples, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    samples.append((time.perf_counter() - start) * 1000)
+    return result
+
+
+def run(sessions, turns):
+    timings = {"append turn": [], "load session": [], "list summaries": [], "rename": []}
+    for i in range(sessions):
+        sid = f"bench_{i}"
+        context = {
+            "job_description": "Need a Stripe webhooks expert " * 20,
+            "cover_letter": "I have built this before " * 20,
+            "conversation": "client: hi\nme: hello\n" * 10,
+            "screening_qa": "",
+            "chat_history": [],
+        }
+        history = []
+        for t in range(turns):
+            role = "client" if t % 2 else "assistant"
+            entry = {"role": role, "text": f"turn {t} " * 40}
+            history.append(entry)
+            context["chat_history"].append(dict(entry))
+            _timed(timings["append turn"], conv_db.save_session, sid, f"Session {i}", context, history)
+        _timed(timings["load session"], conv_db.load_session, sid)
+        _timed(timings["list summaries"], conv_db.list_session_summaries, 20)
+        _timed(timings["rename"], conv_db.rename_session, sid, f"Renamed {i}")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=10)
+    args = parser.parse_args()
+
+    telemetry.ENABLED = False  # keep bench spans out of the app's metrics.db
+    results = {}
+    original = conv_db._connection
+    for label, connection in (("per-call connect", _connect_per_call), ("pooled", original)):
+        with tempfile.TemporaryDirectory() as tmp:
+            conv_db.close_all()
+            conv_db.DB_PATH = os.path.join(tmp, "bench.db")
+            conv_db._connection = connection
+            try:
+                results[label] = run(args.sessions, args.turns)
+            finally:
+                conv_db._connection = original
+                conv_db.close_all()
+
+    print(f"{'operation':<16} {'per-call p50':>13} {'pooled p50':>11} {'per-call mean':>14} {'pooled mean':>12}")
+    for op in results["pooled"]:
+        before, after = results["per-call connect"][op], results["pooled"][op]
+        print(
+            f"{op:<16} {statistics.median(before):>11.3f}ms {statistics.median(after):>9.3f}ms "
+            f"{statistics.fmean(before):>12.3f}ms {statistics.fmean(after):>10.3f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
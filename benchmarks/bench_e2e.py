@@ -0,0 +1,295 @@
+"""
+Offline end-to-end benchmark of the app's main flows.
+
+The provider clients behind `stream_llm_response`, the embedding model and
+the vector index are swapped for the stand-ins in `src.fakes`, with
+configurable latency and token rate. Every database is created in a scratch
+directory. The flows are then run headlessly through the same prompt
+builders the UI uses (`src.prompts`):
+
+  proposal      RAG lookup, image upload, proposal + screening answers in parallel
+  conversation  follow-up turn on a session with history, then the session save
+  quick_reply   Conversation Reply tab
+  2english      2English tab
+
+For each flow and provider it records time to first token and total latency,
+both measured from the start of the flow. It also records request payload
+bytes and DB write time. Results are written as JSON, and `--baseline`
+prints the change against an earlier run.
+
+    python -m benchmarks.bench_e2e --iterations 5 --out e2e.json
+    python -m benchmarks.bench_e2e --first-token-delay 0.5 --tokens-per-sec 60 --baseline e2e.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+
+import config
+from benchmarks.bench_ingest import write_synthetic_csv
+from src import conv_db, llm_clients, row_store, telemetry, vectordb_utils
+from src.fakes import FakeEmbeddings, FakeIndex, FakeOpenAIClient, FakeAnthropicClient, FakeGeminiModel
+from src.image_prep import prepare_upload
+from src.ingest import ingest_csv
+from src.llm import stream_llm_response
+from src.llm_async import run_fan_out
+from src.prompts import (
+    proposal_context, proposal_content, screening_context_prompt,
+    build_conv_messages, summary_messages, quick_reply_messages,
+    english_rewrite_prompt, english_rewrite_messages,
+)
+
+FLOWS = ("proposal", "conversation", "quick_reply", "2english")
+MODELS = {"openai": "gpt-5.5", "anthropic": "claude-opus-4-7", "google": "gemini-3.1-pro-preview"}
+TONE = {"descriptors": "professional, kind, and polished",
+        "instruction": "Write in a professional but kind tone."}
+SAMPLE_IMAGE = os.path.join(config.PROJECT_ROOT, "pizza.jpeg")
+
+JOB = ("We need a senior full-stack developer to add Stripe subscriptions, usage-based billing "
+       "and webhooks to our React/Node SaaS dashboard. Postgres, AWS, CI experience required. ") * 6
+CONVERSATION = "\n".join(
+    f"{'Client' if i % 2 else 'Me'}: message {i} about scope, timeline and Stripe webhooks." for i in range(20)
+)
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        fake = dict(first_token_delay=args.first_token_delay, tokens_per_sec=args.tokens_per_sec, tokens=args.tokens)
+        self.clients = {
+            "openai": FakeOpenAIClient(**fake),
+            "anthropic": FakeAnthropicClient(**fake),
+            "google": FakeGeminiModel(**fake),
+        }
+
+    def install(self):
+        llm_clients.close_all()
+        llm_clients.CLIENT_FACTORIES["openai"] = lambda key, timeout: self.clients["openai"]
+        llm_clients.CLIENT_FACTORIES["anthropic"] = lambda key, timeout: self.clients["anthropic"]
+        llm_clients.GEMINI_MODEL_FACTORY = lambda key, name, temperature: self.clients["google"]
+        vectordb_utils.use_backends(
+            index=FakeIndex(dims=self.args.dims, latency=self.args.index_latency),
+            embed_model=FakeEmbeddings(dims=self.args.dims, latency=self.args.embed_latency),
+        )
+
+    def _payload(self, provider, since):
+        return sum(self.clients[provider].payload_sizes[since:])
+
+    def _stream(self, provider, messages, start):
+        """Run one request; returns (text, seconds from `start` to the first token)."""
+        first, parts = None, []
+        params = {"model": MODELS[provider], "temperature": 0.7}
+        for chunk in stream_llm_response(params, provider, "sk-bench", messages):
+            if first is None and chunk:
+                first = time.perf_counter() - start
+            parts.append(chunk)
+        return "".join(parts), first
+
+    # --- flows: each returns {"ttft", "total", "payload_bytes", "db_write"} ---
+
+    def proposal(self, provider, i):
+        sent = len(self.clients[provider].payload_sizes)
+        start = time.perf_counter()
+        with open(SAMPLE_IMAGE, "rb") as f:
+            mime, data = prepare_upload(f.read(), "image/jpeg")
+        db_start = time.perf_counter()
+        image_parts = [conv_db.image_ref_part(conv_db.put_image(data, mime))]
+        db_write = time.perf_counter() - db_start
+
+        shared = proposal_context(f"{JOB} (variant {i})", "Mention the Stripe Connect rollout.", "Resume text " * 50)
+        questions = "1. Have you built usage-based billing?\n2. How do you test webhooks?"
+        params = {"model": MODELS[provider], "temperature": 0.7}
+        jobs = [
+            {"key": "proposal", "model_params": params, "model_type": provider, "api_key": "sk-bench",
+             "messages": [{"role": "user", "content": proposal_content(shared, image_parts)}]},
+            {"key": "screening", "model_params": params, "model_type": provider, "api_key": "sk-bench",
+             "messages": [{"role": "user", "content": [
+                 {"type": "text", "text": screening_context_prompt(shared, questions)}]}]},
+        ]
+        first = {}
+        run_fan_out(jobs, on_chunk=lambda key, chunk, text: first.setdefault(key, time.perf_counter() - start))
+        return {
+            "ttft": first.get("proposal"),
+            "total": time.perf_counter() - start,
+            "payload_bytes": self._payload(provider, sent),
+            "db_write": db_write,
+        }
+
+    def _conversation_session(self, provider):
+        sid = f"bench_{provider}"
+        context = {
+            "job_description": JOB, "cover_letter": "I have shipped Stripe billing twice. " * 20,
+            "conversation": CONVERSATION, "screening_qa": "", "chat_history": [],
+        }
+        history = []
+        for t in range(self.args.history_turns):
+            role = "assistant" if t % 2 == 0 else "client"
+            entry = {"role": role, "text": f"Turn {t}: details about milestones and the webhook retry policy. " * 15}
+            history.append(dict(entry))
+            context["chat_history"].append(entry)
+        conv_db.save_session(sid, "Bench session", context, history)
+        return sid
+
+    def conversation(self, provider, i):
+        sid = self._conversation_session(provider) if i == 0 else f"bench_{provider}"
+        session = conv_db.load_session(sid)
+        context, history = session["context"], session["chat_history"]
+        sent = len(self.clients[provider].payload_sizes)
+        start = time.perf_counter()
+
+        client_text = f"Follow-up {i}: can we move the billing milestone a week earlier?"
+        history.append({"role": "client", "text": client_text})
+        context["chat_history"].append({"role": "client", "text": client_text})
+
+        def summarize(previous_summary, turns):
+            return self._stream(provider, summary_messages(previous_summary, turns), time.perf_counter())[0]
+
+        messages = build_conv_messages(context, model_type=provider, summarize=summarize)
+        text, ttft = self._stream(provider, messages, start)
+        history.append({"role": "assistant", "text": text})
+        context["chat_history"].append({"role": "assistant", "text": text})
+        db_start = time.perf_counter()
+        conv_db.save_session(sid, session["label"], context, history)
+        db_write = time.perf_counter() - db_start
+        return {
+            "ttft": ttft,
+            "total": time.perf_counter() - start,
+            "payload_bytes": self._payload(provider, sent),
+            "db_write": db_write,
+        }
+
+    def quick_reply(self, provider, i):
+        sent = len(self.clients[provider].payload_sizes)
+        start = time.perf_counter()
+        messages = quick_reply_messages(
+            f"Hi, quick question {i}: is the invoice for March ready?", "Yes, sending it today.", TONE
+        )
+        _, ttft = self._stream(provider, messages, start)
+        return {"ttft": ttft, "total": time.perf_counter() - start,
+                "payload_bytes": self._payload(provider, sent), "db_write": 0.0}
+
+    def english(self, provider, i):
+        sent = len(self.clients[provider].payload_sizes)
+        start = time.perf_counter()
+        messages = [{"role": "user", "content": [
+            {"type": "text", "text": english_rewrite_prompt(f"i will sending the report tomorrow {i}", TONE)}]}]
+        _, ttft = self._stream(provider, english_rewrite_messages(messages, TONE), start)
+        return {"ttft": ttft, "total": time.perf_counter() - start,
+                "payload_bytes": self._payload(provider, sent), "db_write": 0.0}
+
+
+def _summary(samples):
+    values = sorted(v * 1000 for v in samples if v is not None)
+    if not values:
+        return None
+    return {
+        "p50": statistics.median(values),
+        "p95": values[min(len(values) - 1, round(0.95 * (len(values) - 1)))],
+        "mean": statistics.fmean(values),
+    }
+
+
+def run(bench, args):
+    flows = {"proposal": bench.proposal, "conversation": bench.conversation,
+             "quick_reply": bench.quick_reply, "2english": bench.english}
+    results = {}
+    for flow in args.flows:
+        results[flow] = {}
+        for provider in args.providers:
+            runs = [flows[flow](provider, i) for i in range(args.iterations)]
+            results[flow][provider] = {
+                "ttft_ms": _summary([r["ttft"] for r in runs]),
+                "total_ms": _summary([r["total"] for r in runs]),
+                "db_write_ms": _summary([r["db_write"] for r in runs]),
+                "payload_bytes": round(statistics.fmean(r["payload_bytes"] for r in runs)),
+            }
+    return results
+
+
+def _print(results, baseline=None):
+    def delta(flow, provider, metric, value, key="p50"):
+        try:
+            old = baseline["flows"][flow][provider][metric]
+            old = old[key] if isinstance(old, dict) else old
+        except (KeyError, TypeError):
+            return ""
+        return f" ({(value - old) / old:+.0%})" if old else ""
+
+    print(f"{'flow':<13} {'provider':<10} {'ttft p50':>16} {'total p50':>17} {'payload':>17} {'db write p50':>16}")
+    for flow, providers in results.items():
+        for provider, r in providers.items():
+            ttft, total, db = r["ttft_ms"]["p50"], r["total_ms"]["p50"], r["db_write_ms"]["p50"]
+            payload = r["payload_bytes"]
+            print(
+                f"{flow:<13} {provider:<10} "
+                f"{ttft:>7.0f}ms{delta(flow, provider, 'ttft_ms', ttft):<7} "
+                f"{total:>7.0f}ms{delta(flow, provider, 'total_ms', total):<7} "
+                f"{payload / 1024:>6.1f}KB{delta(flow, provider, 'payload_bytes', payload):<7} "
+                f"{db:>7.2f}ms"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flows", nargs="+", choices=FLOWS, default=list(FLOWS))
+    parser.add_argument("--providers", nargs="+", choices=list(MODELS), default=list(MODELS))
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--first-token-delay", type=float, default=0.3, help="simulated model latency before the first token (s)")
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0)
+    parser.add_argument("--tokens", type=int, default=150, help="tokens per simulated response")
+    parser.add_argument("--embed-latency", type=float, default=0.08, help="per embedding call (s)")
+    parser.add_argument("--index-latency", type=float, default=0.04, help="per index query (s)")
+    parser.add_argument("--dims", type=int, default=256, help="fake embedding size (the real model uses 3072)")
+    parser.add_argument("--saved-replies", type=int, default=300)
+    parser.add_argument("--history-turns", type=int, default=30, help="prior turns in the conversation session")
+    parser.add_argument("--out", help="write results JSON here (default: print only)")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conv_db.close_all()
+        conv_db.DB_PATH = os.path.join(tmp, "conv_sessions.db")
+        telemetry.DB_PATH = os.path.join(tmp, "metrics.db")
+        row_store.DB_PATH = os.path.join(tmp, "saved_replies.db")
+        config.SAVED_REPLY_CSV = os.path.join(tmp, "info.csv")
+        write_synthetic_csv(config.SAVED_REPLY_CSV, args.saved_replies)
+        bench = Bench(args)
+        try:
+            bench.install()
+            ingest_csv(config.SAVED_REPLY_CSV, vectordb_utils.get_embed_model(), vectordb_utils.get_index(),
+                       model_name=config.ModelType.embedding.value)
+            results = run(bench, args)
+            stages = telemetry.stage_stats()
+        finally:
+            conv_db.close_all()
+            llm_clients.close_all()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    _print(results, baseline)
+    print(f"\n{'stage':<22} {'model':<24} {'n':>4} {'p50':>9} {'p95':>9}")
+    for row in stages:
+        print(f"{row['stage']:<22} {row['model']:<24} {row['count']:>4} "
+              f"{row['p50_ms']:>7.1f}ms {row['p95_ms']:>7.1f}ms")
+
+    if args.out:
+        report = {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "settings": {k: v for k, v in vars(args).items() if k not in ("out", "baseline")},
+            "flows": results,
+            "stages": stages,
+        }
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
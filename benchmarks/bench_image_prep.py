@@ -0,0 +1,82 @@
+"""
+Payload size and encode time of src/image_prep on the bundled sample images.
+
+Each image is stored through `prepare_upload` in a scratch image store, then
+prepared for every provider. The "raw" column is the data URL the app sent
+before (original bytes, base64). `--upscale 4` also runs 4x enlarged copies,
+which stand in for phone photos and high-DPI screenshots.
+
+    python -m benchmarks.bench_image_prep --upscale 1 4
+"""
+
+import argparse
+import base64
+import os
+import tempfile
+import time
+from io import BytesIO
+
+from PIL import Image
+
+from config import PROJECT_ROOT
+from src import conv_db, image_prep, telemetry
+
+SAMPLES = ["fridge_food.jpg", "pizza.jpeg", os.path.join("images", "cat_wake01.png")]
+MIMES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png"}
+
+
+def _load(name, upscale):
+    with open(os.path.join(PROJECT_ROOT, name), "rb") as f:
+        data = f.read()
+    if upscale == 1:
+        return data
+    img = Image.open(BytesIO(data))
+    out = BytesIO()
+    img.resize((img.width * upscale, img.height * upscale), Image.LANCZOS).save(out, format=img.format)
+    return out.getvalue()
+
+
+def _url_bytes(data):
+    return len(base64.b64encode(data))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--upscale", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--providers", nargs="+", default=list(image_prep.PROVIDER_LIMITS))
+    args = parser.parse_args()
+
+    print(f"{'image':<26} {'provider':<10} {'size':>11} {'raw':>9} {'prepared':>9} {'ratio':>6} "
+          f"{'encode':>9} {'memoized':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        conv_db.close_all()
+        conv_db.DB_PATH = os.path.join(tmp, "bench.db")
+        telemetry.DB_PATH = os.path.join(tmp, "metrics.db")
+        try:
+            for upscale in args.upscale:
+                for name in SAMPLES:
+                    data = _load(name, upscale)
+                    label = f"{os.path.basename(name)} x{upscale}"
+                    start = time.perf_counter()
+                    mime, stored = image_prep.prepare_upload(data, MIMES[os.path.splitext(name)[1]])
+                    upload_ms = (time.perf_counter() - start) * 1000
+                    ref = conv_db.put_image(stored, mime)
+                    size = "x".join(map(str, Image.open(BytesIO(data)).size))
+                    print(f"{label:<26} {'(store)':<10} {size:>11} {len(data) / 1024:>7.0f}KB "
+                          f"{len(stored) / 1024:>7.0f}KB {len(stored) / len(data):>6.2f} {upload_ms:>7.1f}ms")
+                    for provider in args.providers:
+                        start = time.perf_counter()
+                        url = image_prep.prepared_data_url(ref, provider)
+                        cold_ms = (time.perf_counter() - start) * 1000
+                        start = time.perf_counter()
+                        image_prep.prepared_data_url(ref, provider)
+                        warm_ms = (time.perf_counter() - start) * 1000
+                        raw = _url_bytes(data)
+                        print(f"{'':<26} {provider:<10} {'':>11} {raw / 1024:>7.0f}KB {len(url) / 1024:>7.0f}KB "
+                              f"{len(url) / raw:>6.2f} {cold_ms:>7.1f}ms {warm_ms:>7.3f}ms")
+        finally:
+            conv_db.close_all()
+
+
+if __name__ == "__main__":
+    main()
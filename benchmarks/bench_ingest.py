@@ -0,0 +1,121 @@
+"""
+Offline throughput benchmark for the saved-reply ingestion pipeline.
+
+Runs `src.ingest.ingest_csv` against the fake embedder and index with
+simulated network latency, once in the old one-row-per-call shape and once
+batched, and prints rows/sec for each. It then runs `sync_csv` three times:
+an initial sync, a no-op re-sync, and a re-sync after editing, deleting and
+inserting rows. It prints the embedding calls each sync makes.
+
+    python -m benchmarks.bench_ingest --rows 2000
+    python -m benchmarks.bench_ingest --csv fixture/info.csv --batch-size 128 --workers 8
+"""
+
+import argparse
+import csv
+import os
+import tempfile
+
+from src.fakes import FakeEmbeddings, FakeIndex
+from src.ingest import ingest_csv, sync_csv, SyncManifest, EMBED_BATCH_SIZE, UPSERT_BATCH_SIZE, MAX_WORKERS
+
+
+def write_synthetic_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["no", "client", "date", "title", "details"])
+        for i in range(rows):
+            writer.writerow([
+                i, f"client {i % 37}", "2024-01-01",
+                f"Project {i}: dashboard with React and Node",
+                f"Built feature {i} with Postgres, Stripe webhooks and CI. " * 4,
+            ])
+
+
+def run(label, csv_path, args, **kwargs):
+    embedder = FakeEmbeddings(dims=args.dims, latency=args.embed_latency, per_text_latency=args.per_text_latency)
+    index = FakeIndex(dims=args.dims, latency=args.upsert_latency)
+    stats = ingest_csv(csv_path, embedder, index, **kwargs)
+    print(
+        f"{label:<10} {stats['rows']:>6} rows  {stats['seconds']:>7.2f}s  "
+        f"{stats['rows_per_sec']:>9.1f} rows/sec  "
+        f"({embedder.calls} embed calls, {index.upsert_calls} upserts)"
+    )
+    return stats
+
+
+def _edit_csv(path):
+    """Edit every 20th row, drop every 50th and insert a row at the top (shifting the rest)."""
+    with open(path, newline="") as f:
+        header, *rows = list(csv.reader(f))
+    edited = [["new", "client new", "2024-02-01", "Project new: Shopify Plus store", "Fresh row."]]
+    for i, row in enumerate(rows):
+        if i % 50 == 49:
+            continue
+        if i % 20 == 0:
+            row = row[:4] + [row[4] + " Updated."]
+        edited.append(row)
+    with open(path, "w", newline="") as f:
+        csv.writer(f).writerows([header] + edited)
+
+
+def run_sync(csv_path, tmp, args):
+    embedder = FakeEmbeddings(dims=args.dims, latency=args.embed_latency, per_text_latency=args.per_text_latency)
+    index = FakeIndex(dims=args.dims, latency=args.upsert_latency)
+    manifest = SyncManifest("bench", path=os.path.join(tmp, "manifest.db"))
+    sync_path = os.path.join(tmp, "sync.csv")
+    with open(csv_path, newline="") as src, open(sync_path, "w", newline="") as dst:
+        dst.write(src.read())
+
+    for label in ("sync", "re-sync", "edited"):
+        if label == "edited":
+            _edit_csv(sync_path)
+        calls = embedder.calls
+        stats = sync_csv(
+            sync_path, embedder, index, manifest,
+            batch_size=args.batch_size, upsert_batch_size=args.upsert_batch_size, max_workers=args.workers,
+        )
+        print(
+            f"{label:<10} {stats['rows']:>6} rows  {stats['seconds']:>7.2f}s  "
+            f"+{stats['added']} ~{stats['moved']} -{stats['deleted']}  "
+            f"({embedder.calls - calls} embed calls, {index.describe_index_stats()['total_vector_count']} vectors)"
+        )
+    manifest.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", help="CSV to ingest (default: synthetic)")
+    parser.add_argument("--rows", type=int, default=500, help="synthetic row count")
+    parser.add_argument("--dims", type=int, default=256, help="fake embedding dimensions")
+    parser.add_argument("--embed-latency", type=float, default=0.05, help="seconds per embedding call")
+    parser.add_argument("--per-text-latency", type=float, default=0.0005, help="seconds per embedded text")
+    parser.add_argument("--upsert-latency", type=float, default=0.02, help="seconds per upsert call")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--upsert-batch-size", type=int, default=UPSERT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--skip-baseline", action="store_true", help="only run the batched configuration")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = args.csv
+        if not csv_path:
+            csv_path = os.path.join(tmp, "synthetic.csv")
+            write_synthetic_csv(csv_path, args.rows)
+
+        baseline = None
+        if not args.skip_baseline:
+            baseline = run("per-row", csv_path, args, batch_size=1, upsert_batch_size=1, max_workers=1)
+        batched = run(
+            "batched", csv_path, args,
+            batch_size=args.batch_size,
+            upsert_batch_size=args.upsert_batch_size,
+            max_workers=args.workers,
+        )
+        if baseline and baseline["rows_per_sec"]:
+            print(f"speedup: {batched['rows_per_sec'] / baseline['rows_per_sec']:.1f}x")
+        run_sync(csv_path, tmp, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Offline recall@k of dense, lexical and hybrid (RRF) saved-reply retrieval.
+
+Runs every query of a labeled set through `vectordb_utils.retrieve` in each
+mode. For each mode it prints recall@k (the share of a query's relevant rows
+found in the top k, averaged over queries), MRR and the p50 latency of the
+lookup. A labeled set is a JSON list of
+
+    {"query": "job description text", "relevant": [row_no, ...]}
+
+where row numbers are 1-based data rows of the saved-reply CSV. Rows with
+identical text share one vector id and count as one relevant result.
+
+With `--queries`, the configured index and embedding model are used (API
+keys required), against config.SAVED_REPLY_CSV or `--csv`. Without it, a
+synthetic library and query set are generated, with exact tech names
+scattered through generic job text. They are searched with the in-process
+vector index and a hashed bag-of-words embedder. Like a real embedding, that
+embedder scores the many generic words a job post shares with every reply
+about as highly as the one tech name that matters. Treat its numbers as a
+smoke test of the fusion, and use a labeled set of real job posts for
+decisions.
+
+    python -m benchmarks.eval_retrieval
+    python -m benchmarks.eval_retrieval --queries fixture/retrieval_eval.json --k 1 3 5 10
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import random
+import re
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+import config
+from src import row_store, telemetry, vectordb_utils
+from src.ingest import ingest_csv, keyed_saved_replies
+from src.vector_store import LocalVectorIndex
+
+MODES = ("dense", "lexical", "hybrid")
+TECHS = [
+    "Supabase", "Shopify Plus", "Stripe Connect", "Django", "Flutter", "Next.js", "Firebase", "Laravel",
+    "Webflow", "Airtable", "Zapier", "Kubernetes", "Terraform", "GraphQL", "Twilio", "Mapbox", "Elasticsearch",
+    "WooCommerce", "Bubble", "Retool", "Snowflake", "dbt", "HubSpot", "Salesforce", "Unity", "Three.js",
+    "Solidity", "OpenCV", "FastAPI", "Svelte",
+]
+FILLER = [
+    "Built a responsive dashboard with clean, tested components and CI.",
+    "Delivered the MVP on schedule and handled deployment and monitoring.",
+    "Worked closely with the founder on scope, milestones and weekly demos.",
+    "Improved page load times and fixed long-standing bugs in the backend.",
+]
+JOB_TEMPLATE = (
+    "We are a growing startup looking for a reliable developer to help us ship new features. "
+    "You will work on our web app, backend services and integrations, and communicate daily. "
+    "Must have solid experience with {tech}. Bonus points for testing and documentation skills."
+)
+
+
+class HashingEmbeddings:
+    """Bag-of-words vectors via the hashing trick: similar wording, similar vector."""
+
+    def __init__(self, dims):
+        self.dims = dims
+
+    def _vector(self, text):
+        values = np.zeros(self.dims, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            values[int(hashlib.md5(word.encode("utf-8")).hexdigest()[:8], 16) % self.dims] += 1.0
+        return (values / (np.linalg.norm(values) or 1.0)).tolist()
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+def write_synthetic_library(csv_path, rows_per_tech, generic_rows, seed=7):
+    """Write the CSV; returns the labeled queries ({query, relevant}) for it."""
+    rng = random.Random(seed)
+    rows = [(tech, f"{tech} project for a client", f"Used {tech} in production. {rng.choice(FILLER)}")
+            for tech in TECHS for _ in range(rows_per_tech)]
+    rows += [(None, f"Web project {i}", " ".join(rng.sample(FILLER, 2))) for i in range(generic_rows)]
+    rng.shuffle(rows)
+    relevant = {}
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["no", "client", "date", "title", "details"])
+        for row_no, (tech, title, details) in enumerate(rows, start=1):
+            writer.writerow([row_no, f"client {row_no % 23}", "2024-01-01", title, details])
+            if tech:
+                relevant.setdefault(tech, []).append(row_no)
+    return [{"query": JOB_TEMPLATE.format(tech=tech), "relevant": relevant[tech]} for tech in TECHS]
+
+
+def evaluate(queries, ks, modes, row_ids):
+    """`row_ids` maps row numbers to vector ids; rows with identical text count once."""
+    depth = max(ks)
+    report = {}
+    for mode in modes:
+        recalls = {k: [] for k in ks}
+        reciprocal_ranks, seconds = [], []
+        for item in queries:
+            relevant = {row_ids[int(n)] for n in item["relevant"]}
+            start = time.perf_counter()
+            ranked = vectordb_utils.retrieve(item["query"], top_k=depth, mode=mode)
+            seconds.append(time.perf_counter() - start)
+            for k in ks:
+                recalls[k].append(len(relevant.intersection(ranked[:k])) / len(relevant))
+            first = next((rank for rank, n in enumerate(ranked, start=1) if n in relevant), None)
+            reciprocal_ranks.append(1.0 / first if first else 0.0)
+        report[mode] = {
+            "recall": {k: statistics.fmean(v) for k, v in recalls.items()},
+            "mrr": statistics.fmean(reciprocal_ranks),
+            "p50_ms": statistics.median(seconds) * 1000,
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", help="labeled query set (JSON); omit for the synthetic offline set")
+    parser.add_argument("--csv", help="saved-reply CSV for --queries (default: config.SAVED_REPLY_CSV)")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 3, 5, 10])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--rows-per-tech", type=int, default=3, help="synthetic: relevant rows per query")
+    parser.add_argument("--generic-rows", type=int, default=300, help="synthetic: rows matching no query")
+    parser.add_argument("--dims", type=int, default=256, help="synthetic: hashed embedding size")
+    parser.add_argument("--out", help="write the report JSON here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        row_store.DB_PATH = os.path.join(tmp, "saved_replies.db")
+        telemetry.DB_PATH = os.path.join(tmp, "metrics.db")
+        if args.queries:
+            with open(args.queries, "r", encoding="utf-8") as f:
+                queries = json.load(f)
+            if args.csv:
+                config.SAVED_REPLY_CSV = args.csv
+        else:
+            config.SAVED_REPLY_CSV = os.path.join(tmp, "info.csv")
+            queries = write_synthetic_library(config.SAVED_REPLY_CSV, args.rows_per_tech, args.generic_rows)
+            embedder, index = HashingEmbeddings(args.dims), LocalVectorIndex(args.dims)
+            # ids as row_store derives them, which includes the configured model name
+            ingest_csv(config.SAVED_REPLY_CSV, embedder, index, model_name=config.ModelType.embedding.value)
+            vectordb_utils.use_backends(index=index, embed_model=embedder)
+        row_ids = {
+            row_no: vid
+            for vid, row_no, _, _ in keyed_saved_replies(config.SAVED_REPLY_CSV, config.ModelType.embedding.value)
+        }
+        report = evaluate(queries, args.k, args.modes, row_ids)
+
+    source = args.queries or "synthetic library (hashed bag-of-words embeddings)"
+    print(f"{len(queries)} queries from {source}")
+    print(f"{'mode':<9} " + " ".join(f"{f'R@{k}':>7}" for k in args.k) + f" {'MRR':>7} {'p50':>10}")
+    for mode, result in report.items():
+        print(f"{mode:<9} " + " ".join(f"{result['recall'][k]:>7.3f}" for k in args.k)
+              + f" {result['mrr']:>7.3f} {result['p50_ms']:>8.2f}ms")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"queries": len(queries), "source": source, "modes": report}, f, indent=2)
+        print(f"Report written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
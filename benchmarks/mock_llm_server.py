@@ -0,0 +1,113 @@
+"""
+Local HTTP server that streams like the OpenAI and Anthropic APIs.
+
+    POST /v1/chat/completions  -> OpenAI chat.completion.chunk SSE stream
+    POST /v1/messages          -> Anthropic messages SSE stream
+
+Latency knobs: `connect_delay` is charged once per new TCP connection (a
+stand-in for the TCP + TLS handshake a reused connection skips),
+`first_token_delay` before the first chunk, and `token_delay` between chunks.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so clients can reuse connections
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+        if self.server.connect_delay:
+            time.sleep(self.server.connect_delay)
+
+    def log_message(self, *args):
+        pass
+
+    def _send_chunk(self, data):
+        body = data.encode("utf-8")
+        self.wfile.write(f"{len(body):x}\r\n".encode("ascii") + body + b"\r\n")
+        self.wfile.flush()
+
+    def _tokens(self):
+        server = self.server
+        time.sleep(server.first_token_delay)
+        for i in range(server.tokens):
+            if i:
+                time.sleep(server.token_delay)
+            yield f"tok{i} "
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        if self.path.endswith("/chat/completions"):
+            self._stream_openai()
+        elif self.path.endswith("/messages"):
+            self._stream_anthropic()
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _stream_openai(self):
+        for text in self._tokens():
+            chunk = {
+                "id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": 0, "model": "mock",
+                "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}],
+            }
+            self._send_chunk(f"data: {json.dumps(chunk)}\n\n")
+        self._send_chunk("data: [DONE]\n\n")
+
+    def _event(self, name, payload):
+        self._send_chunk(f"event: {name}\ndata: {json.dumps(payload)}\n\n")
+
+    def _stream_anthropic(self):
+        self._event("message_start", {"type": "message_start", "message": {
+            "id": "msg_mock", "type": "message", "role": "assistant", "content": [], "model": "mock",
+            "stop_reason": None, "stop_sequence": None,
+            "usage": {"input_tokens": 10, "output_tokens": 1},
+        }})
+        self._event("content_block_start", {
+            "type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""},
+        })
+        for text in self._tokens():
+            self._event("content_block_delta", {
+                "type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": text},
+            })
+        self._event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        self._event("message_delta", {
+            "type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+            "usage": {"output_tokens": self.server.tokens},
+        })
+        self._event("message_stop", {"type": "message_stop"})
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, connect_delay=0.05, first_token_delay=0.02, token_delay=0.0, tokens=20):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.connect_delay = connect_delay
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.tokens = tokens
+        self.connections = 0
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
@@ -1,6 +1,9 @@
 from enum import Enum
 from os.path import join
 import os
+import string
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -19,6 +22,17 @@ OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 PINECONE_API_KEY = os.environ.get("PINECONE_API_KEY")
 PINECONE_INDEX_NAME = os.environ.get("PINECONE_INDEX_NAME")
 
+# vector store backend: "pinecone" (default) or "local" (in-process NumPy index)
+VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND", "pinecone")
+LOCAL_INDEX_PATH = os.environ.get("LOCAL_INDEX_PATH", join(PROJECT_ROOT, "local_index"))
+# connect to the vector store in the background at app start instead of on first query
+VECTOR_DB_WARMUP = os.environ.get("VECTOR_DB_WARMUP", "true").lower() in ("1", "true", "yes")
+
+# saved-reply library that backs RAG contexts
+SAVED_REPLY_CSV = join(PROJECT_ROOT, "fixture", "info.csv")
+# "hybrid" (vector + BM25, fused by reciprocal rank), "dense" or "lexical"
+RETRIEVAL_MODE = os.environ.get("RETRIEVAL_MODE", "hybrid")
+
 def load_env():
     load_dotenv(join(PROJECT_ROOT, ".env"))
 
@@ -28,15 +42,97 @@ class ModelType(str, Enum):
 class PromptTemplate(Enum):
     UPWORK_PROFILE = "upwork_profile.txt"
     UPWORK_SCREENING_QUESTIONS = "upwork_screening_questions.txt"
+    UPWORK_SCREENING_CONTEXT = "upwork_screening_context.txt"
     JOB_SCREENING_QUESTIONS = "job_screening_questions.txt"
     GENERATE = "generate.txt"
     JOB_COVER_LETTER = "job_cover_letter.txt"
     PROPOSAL = "proposal.txt"
     CONVERSATION_RESPONSE = "conversation_response.txt"
+    CONVERSATION_SUMMARY = "conversation_summary.txt"
     SAVED_REPLY = "saved_reply.txt"
     QUICK_REPLY = "quick_reply.txt"
     LINKEDIN_FOLLOWUP = "linkedin_followup.txt"
     
+# placeholders each template must use, checked whenever a template is (re)loaded
+TEMPLATE_FIELDS = {
+    PromptTemplate.UPWORK_PROFILE: {"profile_title", "skills"},
+    PromptTemplate.UPWORK_SCREENING_QUESTIONS: {"screening_questions"},
+    PromptTemplate.UPWORK_SCREENING_CONTEXT: {"screening_questions", "experience", "important_points", "job_description", "resume"},
+    PromptTemplate.JOB_SCREENING_QUESTIONS: {"screening_questions"},
+    PromptTemplate.GENERATE: {"experience", "important_points", "job_description", "resume"},
+    PromptTemplate.JOB_COVER_LETTER: {"job_description", "job_profile", "name"},
+    PromptTemplate.PROPOSAL: {"conversation", "project_description"},
+    PromptTemplate.CONVERSATION_RESPONSE: {"conversation", "cover_letter", "job_description"},
+    PromptTemplate.CONVERSATION_SUMMARY: {"summary", "turns"},
+    PromptTemplate.SAVED_REPLY: {"details", "title"},
+    PromptTemplate.QUICK_REPLY: {"client_message", "reply_context", "tone_instruction"},
+    PromptTemplate.LINKEDIN_FOLLOWUP: {"job_description", "proposal"},
+}
+TEMPLATE_RELOAD_INTERVAL = 1.0  # seconds between checks of the template files' mtimes
+
+_templates = {}  # PromptTemplate -> (mtime_ns, text)
+_templates_lock = threading.Lock()
+_next_reload_check = 0.0
+
+def _template_path(prompt_template):
+    return join(PROMPT_ROOT, prompt_template.value)
+
+def _read_template(prompt_template):
+    """Return (mtime_ns, text), raising ValueError if the placeholders don't match."""
+    path = _template_path(prompt_template)
+    mtime = os.stat(path).st_mtime_ns
+    with open(path, "rt", encoding="utf-8") as f:
+        text = f.read()
+    fields = {name for _, name, _, _ in string.Formatter().parse(text) if name is not None}
+    expected = TEMPLATE_FIELDS[prompt_template]
+    if fields != expected:
+        raise ValueError(
+            f"Prompt template '{prompt_template.value}' has placeholders {sorted(fields)}, "
+            f"expected {sorted(expected)}"
+        )
+    return mtime, text
+
+def load_templates():
+    """Load and validate every PromptTemplate once; later calls are no-ops."""
+    global _next_reload_check
+    if _templates:
+        return
+    with _templates_lock:
+        if _templates:
+            return
+        loaded, errors = {}, []
+        for prompt_template in PromptTemplate:
+            try:
+                loaded[prompt_template] = _read_template(prompt_template)
+            except (OSError, ValueError) as e:
+                errors.append(str(e))
+        if errors:
+            raise ValueError("Invalid prompt templates:\n" + "\n".join(errors))
+        _templates.update(loaded)
+        _next_reload_check = time.monotonic() + TEMPLATE_RELOAD_INTERVAL
+
+def _reload_changed_templates():
+    # an edit that breaks a template keeps the last good version in use
+    for prompt_template, (mtime, text) in list(_templates.items()):
+        try:
+            current = os.stat(_template_path(prompt_template)).st_mtime_ns
+        except OSError:
+            continue
+        if current == mtime:
+            continue
+        try:
+            _templates[prompt_template] = _read_template(prompt_template)
+        except (OSError, ValueError) as e:
+            _templates[prompt_template] = (current, text)  # report each bad edit once
+            print(f"Keeping previous version of prompt template: {e}")
+
 def get_prompt_template(prompt_template: PromptTemplate):
-    with open(join(PROMPT_ROOT, prompt_template.value), "rt", encoding="utf-8") as f:
-        return f.read()
+    global _next_reload_check
+    if not _templates:
+        load_templates()
+    elif time.monotonic() >= _next_reload_check:
+        with _templates_lock:
+            if time.monotonic() >= _next_reload_check:
+                _reload_changed_templates()
+                _next_reload_check = time.monotonic() + TEMPLATE_RELOAD_INTERVAL
+    return _templates[prompt_template][1]
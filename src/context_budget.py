@@ -0,0 +1,124 @@
+"""
+Token budget for replaying long client threads.
+
+The conversation tab resends the whole thread on every follow-up. Here the
+history is split into a rolling summary (stored in the session as
+`context["summary"]`, covering `chat_history[:context["summary_upto"]]`) and
+a verbatim window of recent turns. When the window outgrows its budget, the
+oldest turns in it are folded into the summary, down to about half the
+budget, so the summary is only refreshed every few turns. Images are only
+resent for the most recent client turns.
+
+Token counts are estimates: tiktoken for OpenAI when it is installed, a
+characters-per-token ratio otherwise, and a flat cost per image.
+"""
+
+from functools import lru_cache
+
+HISTORY_TOKEN_BUDGET = 12000  # verbatim turns, on top of the system prompt
+FOLD_TARGET = 0.5  # fraction of the budget left in the window after folding
+MIN_RECENT_TURNS = 4
+IMAGE_TURNS = 2  # client turns, counted from the newest, that keep their images
+
+CHARS_PER_TOKEN = {"openai": 4.0, "anthropic": 3.5, "google": 4.0}
+IMAGE_TOKENS = {"openai": 765, "anthropic": 1600, "google": 258}
+
+
+@lru_cache(maxsize=1)
+def _openai_encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text, model_type):
+    """Estimated tokens for `text` with the given provider."""
+    if model_type == "openai":
+        encoding = _openai_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+    return int(len(text) / CHARS_PER_TOKEN.get(model_type, 4.0)) + 1
+
+
+def _turn_tokens(entry, model_type, with_images):
+    tokens = count_tokens(entry["text"], model_type) + 4  # role/turn overhead
+    if with_images:
+        tokens += IMAGE_TOKENS.get(model_type, 1000) * len(entry.get("image_parts", ()))
+    return tokens
+
+
+def _image_turns(history, start):
+    """Indexes of the newest IMAGE_TURNS client turns that have images."""
+    keep = [i for i in range(start, len(history)) if history[i].get("image_parts")]
+    return set(keep[-IMAGE_TURNS:])
+
+
+def window_tokens(history, start, model_type):
+    keep_images = _image_turns(history, start)
+    return sum(
+        _turn_tokens(history[i], model_type, i in keep_images) for i in range(start, len(history))
+    )
+
+
+def _fold_point(history, start, model_type, budget):
+    """First index of the newest turns that fit in `budget`, starting on an assistant turn."""
+    keep_images = _image_turns(history, start)
+    latest = len(history) - MIN_RECENT_TURNS
+    total, cut = 0, len(history)
+    for i in range(len(history) - 1, start - 1, -1):
+        total += _turn_tokens(history[i], model_type, i in keep_images)
+        if total > budget and i < latest:
+            break
+        cut = i
+    # the window follows the context prompt (a user turn), so open it on our reply
+    while cut < len(history) and history[cut]["role"] != "assistant":
+        cut += 1
+    return max(start, min(cut, latest))
+
+
+def fit_history(context, model_type, summarize=None, budget=HISTORY_TOKEN_BUDGET):
+    """
+    Return (summary, window) for replaying `context["chat_history"]`.
+
+    If the turns after the stored summary exceed `budget` and `summarize` is
+    given, the oldest of them are folded in with
+    `summarize(previous_summary, turns)`, and `context["summary"]` /
+    `context["summary_upto"]` are updated in place for the caller to save.
+    Window entries beyond the newest IMAGE_TURNS image turns come back
+    without their `image_parts`.
+    """
+    history = context.get("chat_history", [])
+    upto = min(context.get("summary_upto", 0), len(history))
+    summary = context.get("summary", "") if upto else ""
+
+    if summarize is not None and window_tokens(history, upto, model_type) > budget:
+        cut = _fold_point(history, upto, model_type, int(budget * FOLD_TARGET))
+        if cut > upto:
+            summary = summarize(summary, history[upto:cut])
+            upto = cut
+            context["summary"] = summary
+            context["summary_upto"] = upto
+
+    keep_images = _image_turns(history, upto)
+    window = []
+    for i in range(upto, len(history)):
+        entry = history[i]
+        if entry.get("image_parts") and i not in keep_images:
+            entry = {k: v for k, v in entry.items() if k != "image_parts"}
+            entry["text"] += f"\n[{len(history[i]['image_parts'])} earlier image(s) omitted]"
+        window.append(entry)
+    return summary, window
+
+
+def format_turns(turns):
+    """Plain-text transcript of history entries for the summary prompt."""
+    lines = []
+    for entry in turns:
+        speaker = "Client" if entry["role"] == "client" else "Me"
+        text = entry["text"]
+        if entry.get("image_parts"):
+            text += f"\n[attached {len(entry['image_parts'])} image(s)]"
+        lines.append(f"{speaker}: {text}")
+    return "\n\n".join(lines)
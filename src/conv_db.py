@@ -1,87 +1,636 @@
 """
 SQLite persistence for Conversation Response sessions.
 
-Stores sessions as JSON blobs so the full chat history (including image data)
-survives page reloads. Images are stored as base64 strings within the JSON,
-which keeps the schema simple at the cost of DB size.
+Sessions are stored in normalized tables so that a follow-up turn only writes
+that turn:
+
+  sessions        one row per job: label, the fixed job context fields and the
+                  rolling summary of turns folded out of the replay window
+  messages        one row per chat turn, append-only (seq is 0-based per session)
+  blobs           content-addressed image bytes, keyed by sha256
+  message_images  ordered references from a message to its blobs
+
+Two FTS5 tables (session_fts, message_fts) are kept in sync by triggers and
+back `search_sessions`.
+
+`load_all_sessions` returns {id: {label, context, chat_history}} and
+`save_session` accepts the same dicts, diffing them against what is already
+stored. Images inside those dicts are references ("sha256:<hex>"): display
+entries list them under "images", context entries carry
+{"type": "image_ref", "image_ref": ref} parts. Each image is stored once as
+raw bytes and only turned back into a data URL by `resolve_image_refs`, right
+before messages go to a provider.
+
+Connections are pooled: a thread checks one out for the duration of a call
+(nested calls on the same thread share it), and idle connections are reused
+by later calls, so pragmas and the schema check run once rather than on every
+operation. Wrap several writes in `batch()` to commit them together.
 """
 
+import base64
+import hashlib
 import json
+import re
 import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
 from os.path import join, dirname, abspath
 
+from src import telemetry
+
 DB_PATH = join(dirname(dirname(abspath(__file__))), "conv_sessions.db")
 
+SCHEMA_VERSION = 6
+CONTEXT_FIELDS = ("job_description", "cover_letter", "conversation", "screening_qa")
 
-def _get_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS sessions (
-            id TEXT PRIMARY KEY,
-            label TEXT NOT NULL,
-            context_json TEXT NOT NULL,
-            chat_history_json TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    conn.commit()
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS sessions (
+        id TEXT PRIMARY KEY,
+        label TEXT NOT NULL,
+        job_description TEXT NOT NULL DEFAULT '',
+        cover_letter TEXT NOT NULL DEFAULT '',
+        conversation TEXT NOT NULL DEFAULT '',
+        screening_qa TEXT NOT NULL DEFAULT '',
+        summary TEXT NOT NULL DEFAULT '',
+        summary_upto INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at)",
+    """
+    CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+        seq INTEGER NOT NULL,
+        role TEXT NOT NULL,
+        text TEXT NOT NULL,
+        prompt_text TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (session_id, seq)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS blobs (
+        hash TEXT PRIMARY KEY,
+        mime TEXT NOT NULL,
+        data BLOB NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS message_images (
+        message_id INTEGER NOT NULL REFERENCES messages(id) ON DELETE CASCADE,
+        position INTEGER NOT NULL,
+        hash TEXT NOT NULL REFERENCES blobs(hash),
+        PRIMARY KEY (message_id, position)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_message_images_hash ON message_images(hash)",
+    # Full-text search. Message rows use the message id as rowid; the (rare)
+    # context updates and session deletes find their rows by session_id.
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS session_fts USING fts5(
+        session_id UNINDEXED, job_description, cover_letter, conversation, screening_qa,
+        tokenize = 'porter unicode61'
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS message_fts USING fts5(
+        session_id UNINDEXED, body,
+        tokenize = 'porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sessions_fts_insert AFTER INSERT ON sessions BEGIN
+        INSERT INTO session_fts (session_id, job_description, cover_letter, conversation, screening_qa)
+        VALUES (new.id, new.job_description, new.cover_letter, new.conversation, new.screening_qa);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sessions_fts_update
+    AFTER UPDATE OF job_description, cover_letter, conversation, screening_qa ON sessions
+    WHEN old.job_description IS NOT new.job_description
+      OR old.cover_letter IS NOT new.cover_letter
+      OR old.conversation IS NOT new.conversation
+      OR old.screening_qa IS NOT new.screening_qa
+    BEGIN
+        DELETE FROM session_fts WHERE session_id = old.id;
+        INSERT INTO session_fts (session_id, job_description, cover_letter, conversation, screening_qa)
+        VALUES (new.id, new.job_description, new.cover_letter, new.conversation, new.screening_qa);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS sessions_fts_delete AFTER DELETE ON sessions BEGIN
+        DELETE FROM session_fts WHERE session_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO message_fts (rowid, session_id, body) VALUES (new.id, new.session_id, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+        DELETE FROM message_fts WHERE rowid = old.id;
+    END
+    """,
+)
+
+
+# --- connection management ---
+
+MAX_IDLE_CONNECTIONS = 4
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",  # WAL + NORMAL stays consistent, fsyncs at checkpoints
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA cache_size=-16000",  # 16 MB page cache
+    "PRAGMA mmap_size=268435456",  # 256 MB
+    "PRAGMA temp_store=MEMORY",
+)
+
+_local = threading.local()
+_pool_lock = threading.Lock()
+_idle = {}  # db path -> [idle connections]
+_schema_ready = set()  # db paths whose schema is known to be current
+
+
+def _connect(path):
+    # sqlite3 keeps a per-connection cache of compiled statements keyed by SQL
+    # text, so the constant queries below are prepared once per connection.
+    conn = sqlite3.connect(path, check_same_thread=False, cached_statements=256)
+    for pragma in _PRAGMAS:
+        conn.execute(pragma)
     return conn
 
 
-def load_all_sessions() -> dict:
-    """Load all sessions from DB, returning {id: {label, context, chat_history}}."""
-    conn = _get_conn()
+@contextmanager
+def _connection():
+    """Check out a pooled connection for this thread; nested calls share it."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        yield conn
+        return
+
+    path = DB_PATH
+    with _pool_lock:
+        idle = _idle.get(path)
+        conn = idle.pop() if idle else None
+    if conn is None:
+        conn = _connect(path)
+    if path not in _schema_ready:
+        with _pool_lock:
+            if path not in _schema_ready:
+                _ensure_schema(conn)
+                _schema_ready.add(path)
+
+    _local.conn = conn
+    try:
+        yield conn
+    finally:
+        _local.conn = None
+        if conn.in_transaction:
+            conn.rollback()
+        with _pool_lock:
+            idle = _idle.setdefault(path, [])
+            if len(idle) < MAX_IDLE_CONNECTIONS:
+                idle.append(conn)
+                conn = None
+        if conn is not None:
+            conn.close()
+
+
+@contextmanager
+def batch():
+    """
+    Run the enclosed writes in a single transaction:
+
+        with conv_db.batch():
+            save_session(...)
+            rename_session(...)
+
+    Every write function uses this internally, so nested batches just join
+    the outer transaction.
+    """
+    with _connection() as conn:
+        if getattr(_local, "in_batch", False):
+            yield conn
+            return
+        _local.in_batch = True
+        try:
+            with conn:
+                yield conn
+        finally:
+            _local.in_batch = False
+
+
+def close_all():
+    """Close idle pooled connections (e.g. before deleting the DB file)."""
+    with _pool_lock:
+        for conns in _idle.values():
+            for conn in conns:
+                conn.close()
+        _idle.clear()
+        _schema_ready.clear()
+
+
+def _ensure_schema(conn):
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+    legacy = "context_json" in {
+        row[1] for row in conn.execute("PRAGMA table_info(sessions)")
+    }
+    with conn:
+        if legacy:
+            conn.execute("ALTER TABLE sessions RENAME TO sessions_legacy")
+        for statement in _SCHEMA:
+            conn.execute(statement)
+        if legacy:
+            _migrate_legacy(conn)
+        elif version:
+            # fresh databases get the current schema above; older ones step up
+            for step in range(version, SCHEMA_VERSION):
+                if step in _MIGRATIONS:
+                    _MIGRATIONS[step](conn)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def _migrate_legacy(conn):
+    """Copy rows from the old one-JSON-blob-per-session table, then drop it."""
     rows = conn.execute(
-        "SELECT id, label, context_json, chat_history_json FROM sessions ORDER BY updated_at DESC"
+        "SELECT id, label, context_json, chat_history_json, created_at, updated_at FROM sessions_legacy"
     ).fetchall()
-    conn.close()
+    for sid, label, context_json, chat_history_json, created_at, updated_at in rows:
+        _write_session(conn, sid, label, json.loads(context_json), json.loads(chat_history_json))
+        conn.execute(
+            "UPDATE sessions SET created_at = ?, updated_at = ? WHERE id = ?",
+            (created_at, updated_at, sid),
+        )
+    conn.execute("DROP TABLE sessions_legacy")
 
-    sessions = {}
-    for row in rows:
-        sid, label, context_json, chat_history_json = row
-        sessions[sid] = {
-            "label": label,
-            "context": json.loads(context_json),
-            "chat_history": json.loads(chat_history_json),
-        }
-    return sessions
+
+def _migrate_v2_images(conn):
+    """v2 -> v3: move per-message image rows into the content-addressed blob store."""
+    rows = conn.execute("SELECT message_id, position, mime, data FROM images").fetchall()
+    for message_id, position, mime, data in rows:
+        ref = _put_blob(conn, data, mime)
+        conn.execute(
+            "INSERT INTO message_images (message_id, position, hash) VALUES (?, ?, ?)",
+            (message_id, position, _ref_hash(ref)),
+        )
+    conn.execute("DROP TABLE images")
 
 
-def save_session(sid: str, label: str, context: dict, chat_history: list):
-    """Insert or update a single session."""
-    conn = _get_conn()
+def _migrate_v3_session_index(conn):
+    """v3 -> v4: index sessions by updated_at for the paged summary list."""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at)")
+
+
+def _migrate_v4_search_index(conn):
+    """v4 -> v5: backfill the full-text tables (created with the schema) from existing rows."""
+    conn.execute(
+        "INSERT INTO session_fts (session_id, job_description, cover_letter, conversation, screening_qa) "
+        "SELECT id, job_description, cover_letter, conversation, screening_qa FROM sessions"
+    )
+    conn.execute("INSERT INTO message_fts (rowid, session_id, body) SELECT id, session_id, text FROM messages")
+
+
+def _migrate_v5_summary(conn):
+    """v5 -> v6: rolling summary of turns folded out of the replay window."""
+    conn.execute("ALTER TABLE sessions ADD COLUMN summary TEXT NOT NULL DEFAULT ''")
+    conn.execute("ALTER TABLE sessions ADD COLUMN summary_upto INTEGER NOT NULL DEFAULT 0")
+
+
+# keyed by the version being migrated from
+_MIGRATIONS = {
+    2: _migrate_v2_images,
+    3: _migrate_v3_session_index,
+    4: _migrate_v4_search_index,
+    5: _migrate_v5_summary,
+}
+
+
+# --- content-addressed images ---
+
+REF_PREFIX = "sha256:"
+
+
+def _ref_hash(ref):
+    return ref[len(REF_PREFIX):]
+
+
+def is_image_ref(value):
+    return isinstance(value, str) and value.startswith(REF_PREFIX)
+
+
+def _split_data_url(url):
+    """'data:image/png;base64,...' -> ('image/png', raw bytes)."""
+    header, b64 = url.split(",", 1)
+    return header.split(";")[0].split(":")[1], base64.b64decode(b64)
+
+
+def _data_url(mime, data):
+    return f"data:{mime};base64,{base64.b64encode(data).decode('utf-8')}"
+
+
+def _put_blob(conn, data, mime):
+    digest = hashlib.sha256(data).hexdigest()
+    conn.execute(
+        "INSERT OR IGNORE INTO blobs (hash, mime, data) VALUES (?, ?, ?)",
+        (digest, mime, data),
+    )
+    return REF_PREFIX + digest
+
+
+def put_image(data: bytes, mime: str) -> str:
+    """Store raw image bytes once and return their reference."""
+    with telemetry.span("db.put_image", request_bytes=len(data)), batch() as conn:
+        return _put_blob(conn, data, mime)
+
+
+@lru_cache(maxsize=64)
+def load_image(ref: str):
+    """Return (mime, raw bytes) for an image reference."""
+    with _connection() as conn:
+        row = conn.execute("SELECT mime, data FROM blobs WHERE hash = ?", (_ref_hash(ref),)).fetchone()
+    if row is None:
+        raise KeyError(f"Unknown image reference {ref}")
+    return row[0], row[1]
+
+
+def image_ref_part(ref):
+    return {"type": "image_ref", "image_ref": ref}
+
+
+def image_data_url(ref):
+    return _data_url(*load_image(ref))
+
+
+def resolve_image_refs(messages, to_url=image_data_url):
+    """
+    Return messages with image_ref parts replaced by image_url data URLs,
+    built by `to_url(ref)` (e.g. a provider-specific resize of the image).
+    """
+    resolved = []
+    for message in messages:
+        if not any(c.get("type") == "image_ref" for c in message["content"]):
+            resolved.append(message)
+            continue
+        content = [
+            {"type": "image_url", "image_url": {"url": to_url(c["image_ref"])}}
+            if c.get("type") == "image_ref" else c
+            for c in message["content"]
+        ]
+        resolved.append({**message, "content": content})
+    return resolved
+
+
+def _entry_image_refs(conn, display_entry, context_entry):
+    """Image references for a history entry, storing any inline data URLs."""
+    if context_entry and context_entry.get("image_parts"):
+        items = [
+            p["image_ref"] if p["type"] == "image_ref" else p["image_url"]["url"]
+            for p in context_entry["image_parts"]
+        ]
+    else:
+        items = list(display_entry.get("images") or [])
+    refs = []
+    for item in items:
+        if not is_image_ref(item):
+            mime, data = _split_data_url(item)
+            item = _put_blob(conn, data, mime)
+        refs.append(item)
+    return refs
+
+
+# --- writes ---
+
+def _insert_message(conn, sid, seq, display_entry, context_entry):
+    prompt_text = context_entry["text"] if context_entry else None
+    if prompt_text == display_entry["text"]:
+        prompt_text = None
+    cur = conn.execute(
+        "INSERT INTO messages (session_id, seq, role, text, prompt_text) VALUES (?, ?, ?, ?, ?)",
+        (sid, seq, display_entry["role"], display_entry["text"], prompt_text),
+    )
+    conn.executemany(
+        "INSERT INTO message_images (message_id, position, hash) VALUES (?, ?, ?)",
+        [
+            (cur.lastrowid, pos, _ref_hash(ref))
+            for pos, ref in enumerate(_entry_image_refs(conn, display_entry, context_entry))
+        ],
+    )
+
+
+def _write_session(conn, sid, label, context, chat_history):
     conn.execute(
         """
-        INSERT INTO sessions (id, label, context_json, chat_history_json, updated_at)
-        VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        INSERT INTO sessions (id, label, job_description, cover_letter, conversation, screening_qa,
+                              summary, summary_upto, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
         ON CONFLICT(id) DO UPDATE SET
             label = excluded.label,
-            context_json = excluded.context_json,
-            chat_history_json = excluded.chat_history_json,
+            job_description = excluded.job_description,
+            cover_letter = excluded.cover_letter,
+            conversation = excluded.conversation,
+            screening_qa = excluded.screening_qa,
+            summary = excluded.summary,
+            summary_upto = excluded.summary_upto,
             updated_at = CURRENT_TIMESTAMP
         """,
-        (sid, label, json.dumps(context), json.dumps(chat_history)),
+        (
+            sid, label, *(context.get(f, "") for f in CONTEXT_FIELDS),
+            context.get("summary", ""), context.get("summary_upto", 0),
+        ),
     )
-    conn.commit()
-    conn.close()
+
+    context_history = context.get("chat_history", [])
+
+    def context_entry(i):
+        return context_history[i] if i < len(context_history) else None
+
+    # Only the tail of the history can change between saves: new turns are
+    # appended, and "Needs improvement" replaces the last reply in place.
+    last = conn.execute(
+        "SELECT seq, text, prompt_text FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT 1",
+        (sid,),
+    ).fetchone()
+    stored = last[0] + 1 if last else 0
+
+    if stored > len(chat_history):
+        conn.execute("DELETE FROM messages WHERE session_id = ? AND seq >= ?", (sid, len(chat_history)))
+    elif last:
+        seq = last[0]
+        entry = chat_history[seq]
+        ctx = context_entry(seq)
+        prompt_text = ctx["text"] if ctx and ctx["text"] != entry["text"] else None
+        if (entry["text"], prompt_text) != (last[1], last[2]):
+            conn.execute("DELETE FROM messages WHERE session_id = ? AND seq = ?", (sid, seq))
+            _insert_message(conn, sid, seq, entry, ctx)
+
+    for seq in range(stored, len(chat_history)):
+        _insert_message(conn, sid, seq, chat_history[seq], context_entry(seq))
+
+
+# --- public API ---
+
+def _load_sessions(conn, sid=None):
+    """Hydrate full session bodies, newest first; all of them or just `sid`."""
+    session_filter, message_filter, params = "", "", ()
+    if sid is not None:
+        session_filter, message_filter, params = "WHERE id = ?", "WHERE m.session_id = ?", (sid,)
+
+    rows = conn.execute(
+        "SELECT id, label, summary, summary_upto, job_description, cover_letter, conversation, screening_qa "
+        f"FROM sessions {session_filter} ORDER BY updated_at DESC",
+        params,
+    ).fetchall()
+
+    sessions = {}
+    for sid, label, summary, summary_upto, *fields in rows:
+        context = dict(zip(CONTEXT_FIELDS, fields))
+        context["summary"] = summary
+        context["summary_upto"] = summary_upto
+        context["chat_history"] = []
+        sessions[sid] = {"label": label, "context": context, "chat_history": []}
+    if not sessions:
+        return sessions
+
+    images = {}
+    for message_id, digest in conn.execute(
+        "SELECT mi.message_id, mi.hash FROM message_images mi "
+        "JOIN messages m ON m.id = mi.message_id "
+        f"{message_filter} ORDER BY mi.message_id, mi.position",
+        params,
+    ):
+        images.setdefault(message_id, []).append(REF_PREFIX + digest)
+
+    for message_id, sid, role, text, prompt_text in conn.execute(
+        "SELECT m.id, m.session_id, m.role, m.text, m.prompt_text FROM messages m "
+        f"{message_filter} ORDER BY m.session_id, m.seq",
+        params,
+    ):
+        sess = sessions[sid]
+        display_entry = {"role": role, "text": text}
+        context_entry = {"role": role, "text": prompt_text if prompt_text is not None else text}
+        refs = images.get(message_id)
+        if refs:
+            display_entry["images"] = refs
+            context_entry["image_parts"] = [image_ref_part(ref) for ref in refs]
+        sess["chat_history"].append(display_entry)
+        sess["context"]["chat_history"].append(context_entry)
+    return sessions
+
+
+def load_all_sessions() -> dict:
+    """Load all sessions from DB, returning {id: {label, context, chat_history}}."""
+    with _connection() as conn:
+        return _load_sessions(conn)
+
+
+def load_session(sid: str):
+    """Load one full session {label, context, chat_history}, or None if missing."""
+    with _connection() as conn:
+        return _load_sessions(conn, sid).get(sid)
+
+
+def list_session_summaries(limit: int = None, offset: int = 0) -> list:
+    """Return [{id, label, updated_at}, ...] newest first, without session bodies."""
+    with _connection() as conn:
+        rows = conn.execute(
+            "SELECT id, label, updated_at FROM sessions ORDER BY updated_at DESC, rowid DESC LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset),
+        ).fetchall()
+    return [{"id": sid, "label": label, "updated_at": updated_at} for sid, label, updated_at in rows]
+
+
+def count_sessions() -> int:
+    with _connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def _fts_query(text):
+    """Turn free text into a safe FTS5 query: all terms required, last one as a prefix."""
+    terms = re.findall(r"\w+", text)
+    if not terms:
+        return None
+    quoted = [f'"{t}"' for t in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def search_sessions(text: str, limit: int = 20) -> list:
+    """
+    Full-text search over job context and message text.
+
+    Returns [{id, label, snippet, score}, ...], best match first, one entry
+    per session. Matched terms in the snippet are wrapped in ** for markdown.
+    """
+    query = _fts_query(text)
+    if query is None:
+        return []
+    with _connection() as conn:
+        # rank first (FTS5 optimizes ORDER BY rank LIMIT), build snippets only for winners
+        hits = []
+        for table in ("message_fts", "session_fts"):
+            hits.extend(
+                (rank, table, rowid, sid)
+                for rowid, sid, rank in conn.execute(
+                    f"SELECT rowid, session_id, rank FROM {table} WHERE {table} MATCH ? ORDER BY rank LIMIT ?",
+                    (query, limit * 5),
+                )
+            )
+        hits.sort()
+        best = {}
+        for rank, table, rowid, sid in hits:
+            if sid not in best:
+                best[sid] = (rank, table, rowid)
+                if len(best) == limit:
+                    break
+        if not best:
+            return []
+
+        results = []
+        for sid, (rank, table, rowid) in best.items():
+            column = 1 if table == "message_fts" else -1
+            snippet = conn.execute(
+                f"SELECT snippet({table}, {column}, '**', '**', '…', 12) FROM {table} "
+                f"WHERE {table} MATCH ? AND rowid = ?",
+                (query, rowid),
+            ).fetchone()[0]
+            label = conn.execute("SELECT label FROM sessions WHERE id = ?", (sid,)).fetchone()
+            results.append({"id": sid, "label": label[0] if label else sid, "snippet": snippet, "score": rank})
+    return results
+
+
+def save_session(sid: str, label: str, context: dict, chat_history: list):
+    """Insert or update a single session, writing only the turns that changed."""
+    with telemetry.span("db.save_session"), batch() as conn:
+        _write_session(conn, sid, label, context, chat_history)
 
 
 def rename_session(sid: str, new_label: str):
     """Rename a session's label."""
-    conn = _get_conn()
-    conn.execute(
-        "UPDATE sessions SET label = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
-        (new_label, sid),
-    )
-    conn.commit()
-    conn.close()
+    with telemetry.span("db.rename_session"), batch() as conn:
+        conn.execute(
+            "UPDATE sessions SET label = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (new_label, sid),
+        )
 
 
 def delete_session(sid: str):
-    """Delete a session by id."""
-    conn = _get_conn()
-    conn.execute("DELETE FROM sessions WHERE id = ?", (sid,))
-    conn.commit()
-    conn.close()
+    """Delete a session by id (its messages cascade) and drop orphaned images."""
+    with telemetry.span("db.delete_session"), batch() as conn:
+        conn.execute("DELETE FROM sessions WHERE id = ?", (sid,))
+        # Blobs younger than a day may belong to a proposal that is still open.
+        conn.execute(
+            """
+            DELETE FROM blobs
+            WHERE hash NOT IN (SELECT hash FROM message_images)
+              AND created_at < datetime('now', '-1 day')
+            """
+        )
@@ -0,0 +1,149 @@
+"""
+On-disk cache for text embeddings.
+
+Vectors are keyed by sha256(model, text) and stored as packed float32 blobs
+in SQLite. Entries are evicted least-recently-used first once the stored
+vectors exceed a byte budget. `CachedEmbeddings` wraps any object with the
+LangChain `embed_documents` / `embed_query` interface so repeated texts (the
+same job description, an unchanged saved reply) skip the embedding API.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from os.path import join, dirname, abspath
+
+DB_PATH = join(dirname(dirname(abspath(__file__))), "embed_cache.db")
+MAX_BYTES = 256 * 1024 * 1024  # ~20k vectors at 3072 dims
+
+
+def _key(model, text):
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+def _pack(values):
+    return array("f", values).tobytes()
+
+
+def _unpack(blob):
+    values = array("f")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+class EmbeddingCache:
+    """SQLite-backed LRU cache of float32 embedding vectors."""
+
+    def __init__(self, path=DB_PATH, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        self._bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()[0]
+
+    def get_many(self, model, texts):
+        """Return a list aligned with `texts`: the cached vector or None."""
+        keys = [_key(model, t) for t in texts]
+        if not keys:
+            return []
+        with self._lock:
+            placeholders = ",".join("?" * len(keys))
+            found = dict(self._conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", keys
+            ))
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, k) for k in found],
+                )
+                self._conn.commit()
+            hits = sum(1 for k in keys if k in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return [_unpack(found[k]) if k in found else None for k in keys]
+
+    def put_many(self, model, texts, vectors):
+        now = time.time()
+        rows = [(_key(model, t), _pack(v), now) for t, v in zip(texts, vectors)]
+        with self._lock:
+            for key, blob, _ in rows:
+                old = self._conn.execute(
+                    "SELECT LENGTH(vector) FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                self._bytes += len(blob) - (old[0] if old else 0)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least-recently-used vectors until under 90% of the byte budget."""
+        if self._bytes <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        cursor = self._conn.execute(
+            "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used ASC"
+        )
+        victims = []
+        for key, size in cursor:
+            if self._bytes <= target:
+                break
+            victims.append((key,))
+            self._bytes -= size
+        cursor.close()
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", victims)
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+                "bytes": self._bytes,
+            }
+
+
+class CachedEmbeddings:
+    """Embedding model wrapper that consults an EmbeddingCache first."""
+
+    def __init__(self, embed_model, cache, model_name):
+        self.embed_model = embed_model
+        self.cache = cache
+        self.model_name = model_name
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        vectors = self.cache.get_many(self.model_name, texts)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            # embed each distinct missing text once
+            unique = list(dict.fromkeys(texts[i] for i in missing))
+            fresh = dict(zip(unique, self.embed_model.embed_documents(unique)))
+            self.cache.put_many(self.model_name, unique, [fresh[t] for t in unique])
+            for i in missing:
+                vectors[i] = list(fresh[texts[i]])
+        return vectors
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
@@ -0,0 +1,235 @@
+"""
+Local stand-ins for the embedding model, the Pinecone index and the LLM
+provider clients.
+
+They mimic the small slice of the real client APIs the app uses, with optional
+artificial latency, so ingestion, retrieval and streaming can be exercised and
+timed without network access or API keys.
+"""
+
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+
+
+class FakeEmbeddings:
+    """Deterministic replacement for OpenAIEmbeddings.
+
+    Each text is hashed into a seeded random unit vector, so the same text
+    always embeds to the same values. `latency` is charged once per call and
+    `per_text_latency` once per input text.
+    """
+
+    def __init__(self, dims=3072, latency=0.0, per_text_latency=0.0):
+        self.dims = dims
+        self.latency = latency
+        self.per_text_latency = per_text_latency
+        self.calls = 0
+        self.texts = 0
+        self._lock = threading.Lock()
+
+    def _vector(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+        rng = random.Random(seed)
+        values = [rng.gauss(0.0, 1.0) for _ in range(self.dims)]
+        norm = math.sqrt(sum(v * v for v in values)) or 1.0
+        return [v / norm for v in values]
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.calls += 1
+            self.texts += len(texts)
+        delay = self.latency + self.per_text_latency * len(texts)
+        if delay:
+            time.sleep(delay)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class FakeIndex:
+    """In-memory replacement for a Pinecone index.
+
+    Supports `upsert`, `query`, `list`, `delete` and `describe_index_stats`
+    with Pinecone-shaped arguments and results. Search is a brute-force
+    cosine scan.
+    """
+
+    def __init__(self, dims=3072, latency=0.0):
+        self.dims = dims
+        self.latency = latency
+        self.upsert_calls = 0
+        self._vectors = {}
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.upsert_calls += 1
+            for vec in vectors:
+                self._vectors[vec["id"]] = (list(vec["values"]), dict(vec.get("metadata") or {}))
+        return {"upserted_count": len(vectors)}
+
+    def list(self, prefix=None, limit=100):
+        with self._lock:
+            ids = [vid for vid in self._vectors if prefix is None or vid.startswith(prefix)]
+        for start in range(0, len(ids), limit):
+            yield ids[start:start + limit]
+
+    def delete(self, ids=None, delete_all=False):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if delete_all:
+                self._vectors.clear()
+            for vid in ids or []:
+                self._vectors.pop(vid, None)
+        return {}
+
+    def query(self, vector, top_k=5, include_values=False, include_metadata=False):
+        if self.latency:
+            time.sleep(self.latency)
+        q_norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        with self._lock:
+            items = list(self._vectors.items())
+        scored = []
+        for vid, (values, metadata) in items:
+            dot = sum(a * b for a, b in zip(vector, values))
+            norm = math.sqrt(sum(v * v for v in values)) or 1.0
+            scored.append((dot / (q_norm * norm), vid, values, metadata))
+        scored.sort(key=lambda item: item[0], reverse=True)
+
+        matches = []
+        for score, vid, values, metadata in scored[:top_k]:
+            match = {"id": vid, "score": score}
+            if include_values:
+                match["values"] = values
+            if include_metadata:
+                match["metadata"] = metadata
+            matches.append(match)
+        return {"matches": matches}
+
+    def describe_index_stats(self):
+        with self._lock:
+            count = len(self._vectors)
+        return {"dimension": self.dims, "total_vector_count": count}
+
+
+def _payload_bytes(payload):
+    """Approximate request size on the wire: JSON, with raw bytes as base64."""
+    def default(obj):
+        if isinstance(obj, (bytes, bytearray)):
+            return "x" * (4 * math.ceil(len(obj) / 3))
+        return str(obj)
+    return len(json.dumps(payload, default=default).encode("utf-8"))
+
+
+class _FakeStreamModel:
+    """Token timing shared by the fake provider clients.
+
+    `first_token_delay` is charged before the first token and tokens then
+    arrive at `tokens_per_sec`. Each request's approximate size is appended
+    to `payload_sizes`.
+    """
+
+    def __init__(self, first_token_delay=0.3, tokens_per_sec=80.0, tokens=200, text="word"):
+        self.first_token_delay = first_token_delay
+        self.tokens_per_sec = tokens_per_sec
+        self.tokens = tokens
+        self.text = text
+        self.requests = 0
+        self.payload_sizes = []
+        self._lock = threading.Lock()
+
+    def _record(self, payload):
+        size = _payload_bytes(payload)
+        with self._lock:
+            self.requests += 1
+            self.payload_sizes.append(size)
+
+    def _token_stream(self):
+        if self.first_token_delay:
+            time.sleep(self.first_token_delay)
+        gap = 1.0 / self.tokens_per_sec if self.tokens_per_sec else 0.0
+        for i in range(self.tokens):
+            if i and gap:
+                time.sleep(gap)
+            yield f"{self.text}{i} "
+
+
+class _Obj:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class FakeOpenAIClient(_FakeStreamModel):
+    """Stands in for `openai.OpenAI`: `chat.completions.create(stream=True)`."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.chat = _Obj(completions=_Obj(create=self._create))
+
+    def _create(self, **kwargs):
+        self._record(kwargs)
+        for token in self._token_stream():
+            yield _Obj(choices=[_Obj(delta=_Obj(content=token))])
+        if kwargs.get("stream_options", {}).get("include_usage"):
+            yield _Obj(choices=[], usage=_Obj(
+                prompt_tokens=_payload_bytes(kwargs["messages"]) // 4, completion_tokens=self.tokens,
+                prompt_tokens_details=_Obj(cached_tokens=0),
+            ))
+
+    def close(self):
+        pass
+
+
+class _FakeAnthropicStream:
+    def __init__(self, client, tokens):
+        self._client = client
+        self._tokens = tokens
+        self.text_stream = client._token_stream()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def get_final_message(self):
+        return _Obj(usage=_Obj(
+            input_tokens=self._tokens, output_tokens=self._client.tokens,
+            cache_creation_input_tokens=0, cache_read_input_tokens=0,
+        ))
+
+
+class FakeAnthropicClient(_FakeStreamModel):
+    """Stands in for `anthropic.Anthropic`: `messages.stream(...)`."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.messages = _Obj(stream=self._stream)
+
+    def _stream(self, **kwargs):
+        self._record(kwargs)
+        return _FakeAnthropicStream(self, _payload_bytes(kwargs["messages"]) // 4)
+
+    def close(self):
+        pass
+
+
+class FakeGeminiModel(_FakeStreamModel):
+    """Stands in for `genai.GenerativeModel`: `generate_content(stream=True)`."""
+
+    def generate_content(self, contents, stream=True, request_options=None):
+        self._record(contents)
+        for token in self._token_stream():
+            yield _Obj(text=token, usage_metadata=None)
+        yield _Obj(text="", usage_metadata=_Obj(
+            prompt_token_count=_payload_bytes(contents) // 4, candidates_token_count=self.tokens,
+            cached_content_token_count=0,
+        ))
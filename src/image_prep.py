@@ -0,0 +1,99 @@
+"""
+Image preprocessing before storage and before each provider request.
+
+Uploads are normalized once when stored (EXIF orientation applied, metadata
+stripped, capped at STORE_MAX_SIDE, recompressed). At send time each image is
+downscaled to what the provider will actually use (larger images are
+resized server-side anyway, after paying for the upload) and re-encoded as
+WebP, which all three providers accept. Results are memoized by image
+reference, which is a content hash, so replaying a conversation does not
+re-encode its images.
+"""
+
+import base64
+from functools import lru_cache
+from io import BytesIO
+
+from PIL import Image, ImageOps, features
+
+from src.conv_db import load_image
+
+# longest side, and for OpenAI the shortest side its high-detail mode keeps
+PROVIDER_LIMITS = {
+    "openai": {"max_side": 2048, "max_short_side": 768},
+    "anthropic": {"max_side": 1568},
+    "google": {"max_side": 1536},
+}
+STORE_MAX_SIDE = 2560
+WEBP_QUALITY = 82
+JPEG_QUALITY = 85
+STORE_QUALITY = 90
+
+_WEBP = features.check("webp")
+
+
+def _target_size(size, max_side, max_short_side=None):
+    width, height = size
+    scale = min(1.0, max_side / max(width, height))
+    if max_short_side:
+        scale = min(scale, max_short_side / min(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _encode(img, quality):
+    """Encode as WebP (JPEG if Pillow lacks WebP); returns (mime, bytes)."""
+    out = BytesIO()
+    if _WEBP:
+        img.save(out, format="WEBP", quality=quality, method=4)
+        return "image/webp", out.getvalue()
+    if img.mode not in ("RGB", "L"):
+        background = Image.new("RGB", img.size, "white")
+        background.paste(img, mask=img.convert("RGBA").getchannel("A"))
+        img = background
+    img.save(out, format="JPEG", quality=quality, optimize=True)
+    return "image/jpeg", out.getvalue()
+
+
+def preprocess(data, mime, max_side, max_short_side=None, quality=WEBP_QUALITY):
+    """
+    Return (mime, bytes) with orientation applied, metadata dropped and the
+    image fit within the limits. The original is kept when it already fits,
+    carries no EXIF and is smaller than the re-encoded version; animated
+    images are always kept as they are.
+    """
+    img = Image.open(BytesIO(data))
+    if getattr(img, "is_animated", False):
+        return mime, data
+    has_exif = bool(img.getexif())
+    original_size = img.size
+    img = ImageOps.exif_transpose(img)
+    size = _target_size(img.size, max_side, max_short_side)
+    if img.mode not in ("RGB", "RGBA", "L", "LA"):
+        img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("P", "PA") else "RGB")
+    if img.size != size:
+        img = img.resize(size, Image.LANCZOS)
+    new_mime, encoded = _encode(img, quality)
+    if size == original_size and not has_exif and len(data) <= len(encoded):
+        return mime, data
+    return new_mime, encoded
+
+
+def prepare_upload(data, mime):
+    """Normalize an uploaded image for storage."""
+    return preprocess(data, mime, STORE_MAX_SIDE, quality=STORE_QUALITY)
+
+
+@lru_cache(maxsize=128)
+def prepare_ref(ref, provider):
+    """(mime, bytes) of a stored image, sized and encoded for `provider`."""
+    mime, data = load_image(ref)
+    limits = PROVIDER_LIMITS.get(provider)
+    if limits is None:
+        return mime, data
+    return preprocess(data, mime, **limits)
+
+
+@lru_cache(maxsize=128)
+def prepared_data_url(ref, provider):
+    mime, data = prepare_ref(ref, provider)
+    return f"data:{mime};base64,{base64.b64encode(data).decode('utf-8')}"
@@ -0,0 +1,411 @@
+"""
+Bulk ingestion of the saved-reply CSV into the vector index.
+
+Rows are formatted with the SAVED_REPLY template, embedded in batches and
+upserted in chunks over a bounded thread pool. The embedding model and index
+are passed in, so the same pipeline runs against Pinecone or against the
+local fakes in `src/fakes.py` for offline benchmarking.
+
+Vector ids are derived from the embedded text (and the embedding model), so
+re-ingesting a row overwrites its vector instead of adding a duplicate. The
+id is also the retrieval key (`src.row_store` maps it back to the row), so
+vectors carry no row number and rows that move in the CSV need no index
+writes. `sync_csv` keeps a manifest of the ids already in an index, only
+embeds new or edited rows and deletes the vectors of removed rows. A missing
+manifest (fresh clone, another machine) is recovered from the ids listed in
+the index.
+
+The CSV is streamed in batches rather than loaded whole. Failing calls are
+retried with exponential backoff. Because the manifest is written after each
+batch lands, an interrupted sync resumes where it stopped.
+"""
+
+import csv
+import hashlib
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from os.path import join, dirname, abspath
+
+from config import get_prompt_template, PromptTemplate
+
+EMBED_BATCH_SIZE = 64
+UPSERT_BATCH_SIZE = 100
+DELETE_BATCH_SIZE = 1000  # Pinecone's limit per delete request
+ID_PREFIX = "reply-"
+MAX_WORKERS = 4
+MAX_RETRIES = 5
+RETRY_BACKOFF = 1.0  # seconds before the first retry; doubles per attempt
+MANIFEST_PATH = join(dirname(dirname(abspath(__file__))), "ingest_manifest.db")
+
+
+def read_saved_replies(csv_file_path):
+    """Yield (row_no, title, details) for each data row; row_no starts at 1."""
+    with open(csv_file_path, 'r', newline='') as file:
+        reader = csv.reader(file)
+        next(reader)  # Skip header
+        for row_no, row in enumerate(reader, start=1):
+            yield row_no, row[3], row[4]
+
+
+def vector_id(text, model_name=""):
+    """Stable id of the vector for `text` embedded with `model_name`."""
+    return ID_PREFIX + hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()[:32]
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _batches(rows, size):
+    """Group an iterator of rows into lists of `size` without materializing it."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def keyed_saved_replies(csv_file_path, model_name=""):
+    """Yield (id, row_no, title, details): each data row with the id of its vector."""
+    template = get_prompt_template(PromptTemplate.SAVED_REPLY)
+    for row_no, title, details in read_saved_replies(csv_file_path):
+        yield vector_id(template.format(title=title, details=details), model_name), row_no, title, details
+
+
+def _formatted_rows(csv_file_path, model_name):
+    """Yield (id, row_no, text) in CSV order."""
+    template = get_prompt_template(PromptTemplate.SAVED_REPLY)
+    for row_no, title, details in read_saved_replies(csv_file_path):
+        text = template.format(title=title, details=details)
+        yield vector_id(text, model_name), row_no, text
+
+
+class _Retry:
+    """Call with exponential backoff and jitter, counting retries across threads."""
+
+    def __init__(self, retries=MAX_RETRIES, backoff=RETRY_BACKOFF):
+        self.retries = retries
+        self.backoff = backoff
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, fn, *args, **kwargs):
+        for attempt in range(self.retries + 1):
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.0)
+                with self._lock:
+                    self.count += 1
+                print(f"{getattr(fn, '__name__', 'call')} failed ({e}); retry {attempt + 1} in {delay:.1f}s")
+                time.sleep(delay)
+
+
+def _embed_and_upsert(batch, embed_model, index, upsert_batch_size, retry):
+    """Embed one batch of (id, row_no, text) with a single call and upsert it in chunks."""
+    embeddings = retry(embed_model.embed_documents, [text for _, _, text in batch])
+    vectors = [
+        {
+            'id': vid,
+            'values': values,
+        }
+        for (vid, _, _), values in zip(batch, embeddings)
+    ]
+    for chunk in _chunks(vectors, upsert_batch_size):
+        retry(index.upsert, vectors=chunk)
+    return batch
+
+
+def _embed_all(batches, embed_model, index, upsert_batch_size, max_workers, retry, on_batch):
+    """
+    Embed and upsert `batches` (an iterator) over the thread pool, with at
+    most 2 * `max_workers` batches read ahead. `on_batch(seq, batch)` is
+    called from this thread as each lands; `seq` is the batch's position.
+    If a batch still fails after its retries, no more are started, the ones
+    in flight are allowed to land, and the error is raised.
+    """
+    def collect(done):
+        error = None
+        for future in done:
+            if future.cancelled():
+                continue
+            try:
+                on_batch(*future.result())
+            except Exception as e:
+                error = error or e
+        return error
+
+    def run(seq, batch):
+        return seq, _embed_and_upsert(batch, embed_model, index, upsert_batch_size, retry)
+
+    error = None
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        pending = set()
+        for seq, batch in enumerate(batches):
+            if len(pending) >= 2 * max_workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                error = collect(done)
+                if error:
+                    for future in pending:
+                        future.cancel()
+                    break
+            pending.add(pool.submit(run, seq, batch))
+        late_error = collect(wait(pending).done)
+    error = error or late_error
+    if error:
+        raise error
+
+
+def ingest_csv(csv_file_path, embed_model, index,
+               batch_size=EMBED_BATCH_SIZE,
+               upsert_batch_size=UPSERT_BATCH_SIZE,
+               max_workers=MAX_WORKERS,
+               on_progress=None,
+               model_name=""):
+    """
+    Embed and upsert every row of the CSV.
+
+    Each batch of `batch_size` rows costs one embedding call and
+    ceil(batch_size / upsert_batch_size) upserts; at most `max_workers`
+    batches are in flight at once. `on_progress(done, total)` is called as
+    batches complete.
+
+    Returns {"rows", "seconds", "rows_per_sec", "retries"}.
+    """
+    total = sum(1 for _ in read_saved_replies(csv_file_path))
+    retry = _Retry()
+
+    start = time.perf_counter()
+    done = 0
+
+    def on_batch(seq, batch):
+        nonlocal done
+        done += len(batch)
+        if on_progress:
+            on_progress(done, total)
+
+    rows = _formatted_rows(csv_file_path, model_name)
+    _embed_all(_batches(rows, batch_size), embed_model, index, upsert_batch_size, max_workers, retry, on_batch)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "rows": done,
+        "seconds": elapsed,
+        "rows_per_sec": done / elapsed if elapsed > 0 else 0.0,
+        "retries": retry.count,
+    }
+
+
+class SyncManifest:
+    """Ids (and the row each vector points at) already synced to one index, kept in SQLite."""
+
+    def __init__(self, target, path=MANIFEST_PATH):
+        self.target = target
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS vectors (
+                target TEXT NOT NULL,
+                id TEXT NOT NULL,
+                row_no INTEGER NOT NULL,
+                PRIMARY KEY (target, id)
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                target TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                last_row INTEGER NOT NULL,
+                rows_done INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def load(self):
+        """{id: row_no} of every vector synced to the target."""
+        with self._lock:
+            return dict(self._conn.execute(
+                "SELECT id, row_no FROM vectors WHERE target = ?", (self.target,)
+            ))
+
+    def put(self, items):
+        """Record [(id, row_no), ...] as synced."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO vectors (target, id, row_no) VALUES (?, ?, ?)",
+                [(self.target, vid, row_no) for vid, row_no in items],
+            )
+
+    def remove(self, ids):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM vectors WHERE target = ? AND id = ?", [(self.target, vid) for vid in ids]
+            )
+
+    def checkpoint(self):
+        """The last sync's {"status", "last_row", "rows_done", "updated_at"}, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, last_row, rows_done, updated_at FROM checkpoints WHERE target = ?", (self.target,)
+            ).fetchone()
+        return dict(zip(("status", "last_row", "rows_done", "updated_at"), row)) if row else None
+
+    def set_checkpoint(self, status, last_row, rows_done):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (target, status, last_row, rows_done, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self.target, status, last_row, rows_done, time.time()),
+            )
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM vectors WHERE target = ?", (self.target,))
+            self._conn.execute("DELETE FROM checkpoints WHERE target = ?", (self.target,))
+
+    def close(self):
+        self._conn.close()
+
+
+def _recover_manifest(index, manifest, current):
+    """
+    Rebuild the manifest from the stable ids already in the index. Ids still
+    in the CSV are recorded with their current row; the rest with row 0, so
+    the sync deletes them. Vectors without the ID_PREFIX are not ours to
+    judge and are left alone.
+    """
+    ids = [vid for page in index.list(prefix=ID_PREFIX) for vid in page]
+    known = {vid: current.get(vid, 0) for vid in ids}
+    manifest.put(known.items())
+    return known
+
+
+def sync_csv(csv_file_path, embed_model, index, manifest,
+             batch_size=EMBED_BATCH_SIZE,
+             upsert_batch_size=UPSERT_BATCH_SIZE,
+             max_workers=MAX_WORKERS,
+             on_progress=None,
+             model_name="",
+             rebuild=False):
+    """
+    Bring the index in line with the CSV, touching only what changed.
+
+    New or edited rows are embedded and upserted, and the manifest is updated
+    after every batch. Unchanged rows whose row number shifted are only
+    re-recorded in the manifest (vectors are looked up by id, not row).
+    Vectors of rows no longer in the CSV are deleted. When the manifest has nothing for this index yet, it is
+    recovered from the index first, so nothing already embedded is redone.
+    Only `rebuild=True` empties the index (and manifest) and re-embeds
+    every row. A re-sync of an unchanged CSV makes no embedding calls and
+    no index writes.
+
+    The CSV is streamed twice: once to collect ids, then to embed the rows
+    that are missing. Memory is bounded by the id set plus the batches in
+    flight. Failed embedding/upsert calls are retried with backoff. A run
+    that still fails (or is killed) leaves every landed batch in the
+    manifest, so the next sync resumes with the rows that are left. The
+    checkpoint (`manifest.checkpoint()`) records the last row below which
+    every batch has landed. `on_progress(done, total)` counts rows to embed.
+
+    Returns {"rows", "added", "moved", "deleted", "unchanged", "resumed",
+    "recovered", "retries", "seconds", "rows_per_sec"}.
+    """
+    start = time.perf_counter()
+    retry = _Retry()
+    if rebuild:
+        manifest.clear()
+        retry(index.delete, delete_all=True)
+    previous = manifest.checkpoint()
+    resumed = previous is not None and previous["status"] == "running"
+
+    current = {}
+    for vid, row_no, _ in _formatted_rows(csv_file_path, model_name):
+        current.setdefault(vid, row_no)
+    known = manifest.load()
+    recovered = 0
+    if not known and not rebuild:
+        known = _recover_manifest(index, manifest, current)
+        recovered = len(known)
+    to_embed = {vid for vid in current if vid not in known}
+    moved = [(vid, row_no) for vid, row_no in current.items() if vid in known and known[vid] != row_no]
+    removed = [vid for vid in known if vid not in current]
+
+    def missing_rows():
+        for vid, row_no, text in _formatted_rows(csv_file_path, model_name):
+            if vid in to_embed and current[vid] == row_no:
+                yield vid, row_no, text
+
+    added = 0
+    landed = {}  # seq -> last row of batches that landed out of order
+    next_seq, last_row = 0, 0
+    manifest.set_checkpoint("running", 0, 0)
+
+    def on_batch(seq, batch):
+        nonlocal added, next_seq, last_row
+        manifest.put([(vid, row_no) for vid, row_no, _ in batch])
+        added += len(batch)
+        landed[seq] = batch[-1][1]
+        while next_seq in landed:
+            last_row = landed.pop(next_seq)
+            next_seq += 1
+        manifest.set_checkpoint("running", last_row, added)
+        if on_progress:
+            on_progress(added, len(to_embed))
+
+    _embed_all(_batches(missing_rows(), batch_size), embed_model, index, upsert_batch_size, max_workers,
+               retry, on_batch)
+
+    manifest.put(moved)
+
+    for chunk in _chunks(removed, DELETE_BATCH_SIZE):
+        retry(index.delete, ids=chunk)
+        manifest.remove(chunk)
+    manifest.set_checkpoint("done", last_row, added)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": len(current),
+        "added": added,
+        "moved": len(moved),
+        "deleted": len(removed),
+        "unchanged": len(current) - added - len(moved),
+        "resumed": resumed,
+        "recovered": recovered,
+        "retries": retry.count,
+        "seconds": elapsed,
+        "rows_per_sec": added / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+class ProgressReport:
+    """
+    `on_progress` callback that prints rows done, throughput and ETA, at most
+    every `interval` seconds and once at the end.
+    """
+
+    def __init__(self, label="rows", interval=2.0):
+        self.label = label
+        self.interval = interval
+        self._start = time.perf_counter()
+        self._last = 0.0
+
+    def __call__(self, done, total):
+        now = time.perf_counter()
+        if done < total and now - self._last < self.interval:
+            return
+        self._last = now
+        elapsed = now - self._start
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = f", ETA {(total - done) / rate:.0f}s" if rate and done < total else ""
+        print(f"{done}/{total} {self.label} ({done / total:.0%}) · {rate:.1f} rows/sec{eta}")
@@ -0,0 +1,317 @@
+"""
+Provider-agnostic LLM streaming.
+
+Messages use the OpenAI chat shape ({"role", "content": [parts]}) throughout
+the app; `stream_llm_response` converts them for Gemini and Anthropic and
+yields text chunks as they arrive. SDK clients come from `src.llm_clients`,
+so connections are reused across calls, and repeat requests can be served
+from `src.response_cache`.
+"""
+
+import base64
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+import google.generativeai as genai
+
+from src import llm_clients, telemetry
+from src.image_prep import prepare_ref, prepared_data_url
+from src.conv_db import resolve_image_refs
+from src.response_cache import cached_stream
+
+REQUEST_TIMEOUT = 300  # 5 minutes timeout
+
+# Gemini deletes uploaded files after 48 hours; re-upload an hour before that
+GEMINI_FILE_TTL = 48 * 60 * 60
+GEMINI_FILE_REFRESH_MARGIN = 60 * 60
+MAX_GEMINI_FILES = 64
+
+_gemini_files = OrderedDict()  # (key fingerprint, sha256) -> (file handle, expires_at)
+_gemini_files_lock = threading.Lock()
+
+
+@lru_cache(maxsize=256)
+def _file_digest(path, mtime_ns, size):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _upload_expiry(handle, uploaded_at):
+    expiration = getattr(handle, "expiration_time", None)
+    expires_at = expiration.timestamp() if expiration else uploaded_at + GEMINI_FILE_TTL
+    return expires_at - GEMINI_FILE_REFRESH_MARGIN
+
+def upload_gemini_file(path, api_key=None):
+    """
+    Upload a media file to Gemini once per content hash and API key, reusing
+    the file handle until shortly before Gemini expires it.
+    """
+    stat = os.stat(path)
+    key = (llm_clients._fingerprint(api_key), _file_digest(path, stat.st_mtime_ns, stat.st_size))
+    now = time.time()
+    with _gemini_files_lock:
+        cached = _gemini_files.get(key)
+        if cached and cached[1] > now:
+            _gemini_files.move_to_end(key)
+            return cached[0]
+    handle = genai.upload_file(path)
+    with _gemini_files_lock:
+        _gemini_files[key] = (handle, _upload_expiry(handle, now))
+        while len(_gemini_files) > MAX_GEMINI_FILES:
+            _gemini_files.popitem(last=False)
+    return handle
+
+def _inline_blob(data_url):
+    # the already-encoded image bytes, without a PIL round trip
+    mime, data = data_url[5:].split(";base64,", 1)
+    return {"mime_type": mime, "data": base64.b64decode(data)}
+
+def _gemini_payload_bytes(gemini_messages):
+    """Approximate request size of converted messages; inline bytes count base64-encoded."""
+    size = 0
+    for message in gemini_messages:
+        for part in message["parts"]:
+            if isinstance(part, str):
+                size += len(part.encode("utf-8"))
+            elif isinstance(part, dict):
+                size += 4 * math.ceil(len(part["data"]) / 3)
+    return size
+
+def messages_to_gemini(messages, api_key=None):
+    """
+    Convert to Gemini contents. Stored images (image_ref parts) are sent as
+    inline bytes from `prepare_ref`, memoized by their content hash, so a
+    replayed turn neither re-encodes nor re-decodes them. Images stay inline
+    rather than going through the Files API: sized for Gemini they are a
+    few hundred KB, less than an upload round trip costs.
+    """
+    gemini_messages = []
+    prev_role = None
+    for message in messages:
+        if prev_role and (prev_role == message["role"]):
+            gemini_message = gemini_messages[-1]
+        else:
+            gemini_message = {
+                "role": "model" if message["role"] == "assistant" else "user",
+                "parts": [],
+            }
+
+        for content in message["content"]:
+            if content["type"] == "text":
+                gemini_message["parts"].append(content["text"])
+            elif content["type"] == "image_ref":
+                mime, data = prepare_ref(content["image_ref"], "google")
+                gemini_message["parts"].append({"mime_type": mime, "data": data})
+            elif content["type"] == "image_url":
+                gemini_message["parts"].append(_inline_blob(content["image_url"]["url"]))
+            elif content["type"] == "video_file":
+                gemini_message["parts"].append(upload_gemini_file(content["video_file"], api_key))
+            elif content["type"] == "audio_file":
+                gemini_message["parts"].append(upload_gemini_file(content["audio_file"], api_key))
+
+        if prev_role != message["role"]:
+            gemini_messages.append(gemini_message)
+
+        prev_role = message["role"]
+        
+    return gemini_messages
+
+def _anthropic_part(part):
+    if part["type"] == "image_url":
+        url = part["image_url"]["url"]
+        return {
+            "type": "image",
+            "source": {
+                "type": "base64",
+                "media_type": url.split(";")[0].split(":")[1],
+                "data": url.split(",")[1],
+            },
+        }
+    if part["type"] == "text":
+        return {"type": "text", "text": part["text"]}
+    return None  # video/audio uploads are Gemini-only
+
+def messages_to_anthropic(messages, cache_breakpoints=False):
+    """
+    Convert to Anthropic messages, merging consecutive same-role turns.
+
+    With `cache_breakpoints`, the first message (the long, stable context
+    prompt) and the last two user turns get `cache_control` markers: the
+    newest one writes the prompt cache for the next turn, the one before it
+    reads what the previous turn wrote. Prefixes below the model's minimum
+    cacheable length are simply not cached. Only worth it for multi-turn
+    chats, where the next request resends this one's prefix: a cache write
+    costs more than an uncached read.
+    """
+    anthropic_messages = []
+    prev_role = None
+    for message in messages:
+        if prev_role and (prev_role == message["role"]):
+            anthropic_message = anthropic_messages[-1]
+        else:
+            anthropic_message = {
+                "role": message["role"] ,
+                "content": [],
+            }
+        for part in message["content"]:
+            converted = _anthropic_part(part)
+            if converted is not None:
+                anthropic_message["content"].append(converted)
+
+        if prev_role != message["role"]:
+            anthropic_messages.append(anthropic_message)
+
+        prev_role = message["role"]
+
+    if cache_breakpoints and anthropic_messages:
+        user_turns = [m for m in anthropic_messages if m["role"] == "user"]
+        # at most 3 of the 4 breakpoints Anthropic allows per request
+        for marked in {id(m): m for m in [anthropic_messages[0]] + user_turns[-2:]}.values():
+            if marked["content"]:
+                marked["content"][-1]["cache_control"] = {"type": "ephemeral"}
+
+    return anthropic_messages
+
+def stream_llm_response(model_params, model_type, api_key, messages, cache=None, on_cache_hit=None, on_usage=None,
+                        cache_breakpoints=False):
+    """
+    Yield response text chunks from the selected provider. With a
+    `ResponseCache`, an identical earlier request is replayed from it instead
+    (calling `on_cache_hit()` first) and fresh responses are stored.
+    `on_usage(usage)` receives token usage, including prompt cache reads and
+    writes, once a stream completes. `cache_breakpoints` marks Anthropic
+    prompt cache breakpoints (see messages_to_anthropic). Each call is
+    recorded as an "llm.stream" telemetry span.
+    """
+    with telemetry.span("llm.stream", model=model_params.get("model"), cached=0) as span:
+        def record_usage(usage):
+            span.set(input_tokens=usage["input_tokens"] + usage["cache_creation_input_tokens"]
+                     + usage["cache_read_input_tokens"], output_tokens=usage["output_tokens"])
+            if on_usage:
+                on_usage(usage)
+
+        def hit():
+            span.set(cached=1)
+            if on_cache_hit:
+                on_cache_hit()
+
+        open_stream = lambda: _stream_provider(model_params, model_type, api_key, messages, record_usage, span,
+                                               cache_breakpoints)
+        if cache is None:
+            return (yield from span.stream(open_stream()))
+        return (yield from span.stream(cached_stream(
+            cache, model_params, model_type, messages, open_stream, on_hit=hit,
+        )))
+
+def _anthropic_usage(model_name, usage):
+    return {
+        "provider": "anthropic",
+        "model": model_name,
+        "input_tokens": usage.input_tokens,
+        "output_tokens": usage.output_tokens,
+        "cache_creation_input_tokens": usage.cache_creation_input_tokens or 0,
+        "cache_read_input_tokens": usage.cache_read_input_tokens or 0,
+    }
+
+def _openai_usage(model_name, usage):
+    # prompt_tokens includes the cached prefix; report it the way Anthropic does
+    cached = getattr(usage.prompt_tokens_details, "cached_tokens", 0) or 0
+    return {
+        "provider": "openai",
+        "model": model_name,
+        "input_tokens": usage.prompt_tokens - cached,
+        "output_tokens": usage.completion_tokens,
+        "cache_creation_input_tokens": 0,
+        "cache_read_input_tokens": cached,
+    }
+
+def _gemini_usage(model_name, usage):
+    cached = getattr(usage, "cached_content_token_count", 0) or 0
+    return {
+        "provider": "google",
+        "model": model_name,
+        "input_tokens": usage.prompt_token_count - cached,
+        "output_tokens": usage.candidates_token_count or 0,
+        "cache_creation_input_tokens": 0,
+        "cache_read_input_tokens": cached,
+    }
+
+def _stream_provider(model_params, model_type, api_key, messages, on_usage=None, span=None, cache_breakpoints=False):
+    response_message = ""
+    timeout = REQUEST_TIMEOUT
+    # stored image references only become data URLs for the outgoing request,
+    # resized and re-encoded for this provider (Gemini takes the bytes as they are)
+    if model_type != "google":
+        messages = resolve_image_refs(messages, lambda ref: prepared_data_url(ref, model_type))
+        if span is not None:
+            span.set(request_bytes=telemetry.payload_bytes(messages))
+
+    if model_type == "openai":
+        client = llm_clients.get_client("openai", api_key, timeout)
+        model_name = model_params.get("model", "gpt-5.5")
+        kwargs = {
+            "model": model_name,
+            "messages": messages,
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        }
+        # GPT-5 family (reasoning models) reject temperature/top_p — omit them.
+        if not model_name.startswith("gpt-5.5"):
+            kwargs["temperature"] = model_params.get("temperature", 0.7)
+        for chunk in client.chat.completions.create(**kwargs):
+            if not chunk.choices:
+                # the final chunk carries only usage
+                if on_usage and chunk.usage:
+                    on_usage(_openai_usage(model_name, chunk.usage))
+                continue
+            chunk_text = chunk.choices[0].delta.content or ""
+            response_message += chunk_text
+            yield chunk_text
+
+    elif model_type == "google":
+        model = llm_clients.get_gemini_model(
+            api_key, model_params["model"], model_params.get("temperature", 0.7)
+        )
+        gemini_messages = messages_to_gemini(messages, api_key)
+        if span is not None:
+            span.set(request_bytes=_gemini_payload_bytes(gemini_messages))
+
+        usage = None
+        for chunk in model.generate_content(
+            contents=gemini_messages,
+            stream=True,
+            request_options={'timeout': timeout}
+        ):
+            usage = getattr(chunk, "usage_metadata", None) or usage
+            chunk_text = chunk.text or ""
+            response_message += chunk_text
+            yield chunk_text
+        if on_usage and usage:
+            on_usage(_gemini_usage(model_params["model"], usage))
+
+    elif model_type == "anthropic":
+        client = llm_clients.get_client("anthropic", api_key, timeout)
+        model_name = model_params.get("model", "claude-opus-4-6")
+        kwargs = {
+            "model": model_name,
+            "messages": messages_to_anthropic(messages, cache_breakpoints),
+            "max_tokens": 4096,
+        }
+        # Claude Opus 4.7+ rejects temperature/top_p/top_k with 400 — omit them.
+        if not model_name.startswith("claude-opus-4-7"):
+            kwargs["temperature"] = model_params.get("temperature", 0.7)
+        with client.messages.stream(**kwargs) as stream:
+            for text in stream.text_stream:
+                response_message += text
+                yield text
+            if on_usage:
+                on_usage(_anthropic_usage(model_name, stream.get_final_message().usage))
+
+    return response_message
@@ -0,0 +1,130 @@
+"""
+Asyncio streaming on top of `stream_llm_response`, for running several
+models side by side.
+
+The provider SDKs stream synchronously, so each stream is pumped by a worker
+thread that hands chunks to the event loop. `fan_out` runs any number of jobs
+concurrently, so wall-clock time tracks the slowest model rather than the sum.
+Stragglers can be cut off with an overall `timeout` or a `grace` period after
+the first job finishes.
+
+A job is a dict: {"key", "model_params", "model_type", "api_key", "messages"},
+optionally with a "cache" (`ResponseCache`) to serve repeats from.
+"""
+
+import asyncio
+import threading
+import time
+
+from src.llm import stream_llm_response
+
+_DONE = object()
+
+
+async def astream_llm_response(model_params, model_type, api_key, messages, cache=None, on_cache_hit=None):
+    """Async generator over the chunks of `stream_llm_response`."""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def put(item):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            stop.set()  # event loop already closed
+
+    def pump():
+        stream = stream_llm_response(
+            model_params, model_type, api_key, messages, cache=cache, on_cache_hit=on_cache_hit
+        )
+        try:
+            for chunk in stream:
+                if stop.is_set():
+                    return
+                put((chunk, None))
+        except Exception as e:
+            put((None, e))
+            return
+        finally:
+            stream.close()
+        put((_DONE, None))
+
+    threading.Thread(target=pump, name=f"llm-stream-{model_type}", daemon=True).start()
+    try:
+        while True:
+            chunk, error = await queue.get()
+            if error is not None:
+                raise error
+            if chunk is _DONE:
+                return
+            yield chunk
+    finally:
+        # stops the worker at its next chunk when we are cancelled or closed early
+        stop.set()
+
+
+async def _run_job(job, results, on_chunk):
+    result = results[job["key"]]
+    start = time.perf_counter()
+    try:
+        async for chunk in astream_llm_response(
+            job["model_params"], job["model_type"], job["api_key"], job["messages"],
+            cache=job.get("cache"), on_cache_hit=lambda: result.update(cached=True),
+        ):
+            if result["ttft"] is None:
+                result["ttft"] = time.perf_counter() - start
+            result["text"] += chunk
+            if on_chunk:
+                on_chunk(job["key"], chunk, result["text"])
+        result["status"] = "done"
+    except asyncio.CancelledError:
+        result["status"] = "cancelled"
+        raise
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = e
+    finally:
+        result["seconds"] = time.perf_counter() - start
+
+
+async def fan_out(jobs, on_chunk=None, timeout=None, grace=None):
+    """
+    Stream all jobs concurrently.
+
+    `on_chunk(key, chunk, text_so_far)` is called on the event loop thread for
+    every chunk. Jobs still running after `timeout` seconds overall, or
+    `grace` seconds after the first job finishes successfully, are cancelled;
+    a job that fails does not start the grace window.
+
+    Returns {key: {"text", "status", "ttft", "seconds", "error", "cached"}}
+    where status is "done", "cancelled" or "error".
+    """
+    results = {
+        job["key"]: {"text": "", "status": "running", "ttft": None, "seconds": None, "error": None,
+                     "cached": False}
+        for job in jobs
+    }
+    tasks = {asyncio.create_task(_run_job(job, results, on_chunk)): job["key"] for job in jobs}
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout if timeout else None
+
+    pending = set(tasks)
+    while pending:
+        wait_for = None if deadline is None else max(0.0, deadline - loop.time())
+        done, pending = await asyncio.wait(pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+        if not done:
+            break  # overall timeout
+        if grace is not None and any(results[tasks[task]]["status"] == "done" for task in done):
+            grace_deadline = loop.time() + grace
+            deadline = grace_deadline if deadline is None else min(deadline, grace_deadline)
+            grace = None
+
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return results
+
+
+def run_fan_out(jobs, on_chunk=None, timeout=None, grace=None):
+    """Blocking wrapper around `fan_out` for synchronous callers (Streamlit scripts)."""
+    return asyncio.run(fan_out(jobs, on_chunk=on_chunk, timeout=timeout, grace=grace))
@@ -0,0 +1,114 @@
+"""
+Process-wide cache of LLM provider clients.
+
+Building a new `OpenAI(...)` or `anthropic.Anthropic(...)` per request throws
+away its HTTP connection pool, so every call pays a fresh TCP + TLS
+handshake. Clients here are keyed by (provider, API key fingerprint, timeout),
+shared across Streamlit reruns and sessions, bounded by an LRU, and closed
+when evicted or at interpreter exit.
+
+Gemini has no client object in `google.generativeai`; `get_gemini_model`
+caches configured `GenerativeModel` instances instead, which hold on to their
+gRPC channel after the first request.
+"""
+
+import atexit
+import hashlib
+import threading
+from collections import OrderedDict
+
+MAX_CLIENTS = 8
+
+_lock = threading.Lock()
+_clients = OrderedDict()
+_gemini_key = None
+
+
+def _fingerprint(api_key):
+    # keep raw keys out of cache keys (and out of any debug output of them)
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+def _openai_client(api_key, timeout):
+    from openai import OpenAI
+    return OpenAI(api_key=api_key, timeout=timeout)
+
+
+def _anthropic_client(api_key, timeout):
+    import anthropic
+    return anthropic.Anthropic(api_key=api_key, timeout=timeout)
+
+
+# provider -> factory(api_key, timeout); replaceable for local benchmarking
+CLIENT_FACTORIES = {
+    "openai": _openai_client,
+    "anthropic": _anthropic_client,
+}
+
+
+def _close(client):
+    close = getattr(client, "close", None)
+    if close is not None:
+        try:
+            close()
+        except Exception:
+            pass
+
+
+def _cached(key, create):
+    with _lock:
+        client = _clients.get(key)
+        if client is not None:
+            _clients.move_to_end(key)
+            return client
+        client = create()
+        _clients[key] = client
+        evicted = []
+        while len(_clients) > MAX_CLIENTS:
+            evicted.append(_clients.popitem(last=False)[1])
+    for old in evicted:
+        _close(old)
+    return client
+
+
+def get_client(provider, api_key, timeout):
+    """Return a shared SDK client for `provider` ("openai" or "anthropic")."""
+    if provider not in CLIENT_FACTORIES:
+        raise ValueError(f"No client factory for provider '{provider}'")
+    key = (provider, _fingerprint(api_key), timeout)
+    return _cached(key, lambda: CLIENT_FACTORIES[provider](api_key, timeout))
+
+
+def _gemini_model(api_key, model_name, temperature):
+    import google.generativeai as genai
+    global _gemini_key
+    # genai.configure is global state; only reset it when the key changes
+    if _gemini_key != api_key:
+        genai.configure(api_key=api_key)
+        _gemini_key = api_key
+    return genai.GenerativeModel(
+        model_name=model_name,
+        generation_config={"temperature": temperature},
+    )
+
+
+# factory(api_key, model_name, temperature); replaceable like CLIENT_FACTORIES
+GEMINI_MODEL_FACTORY = _gemini_model
+
+
+def get_gemini_model(api_key, model_name, temperature):
+    """Return a shared GenerativeModel for this key/model/temperature."""
+    key = ("google", _fingerprint(api_key), model_name, temperature)
+    return _cached(key, lambda: GEMINI_MODEL_FACTORY(api_key, model_name, temperature))
+
+
+def close_all():
+    """Close and forget every cached client."""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        _close(client)
+
+
+atexit.register(close_all)
@@ -0,0 +1,149 @@
+"""
+Message builders for each app flow.
+
+These turn form inputs into the OpenAI-shaped message lists that
+`stream_llm_response` takes. They have no Streamlit dependency, so the same
+prompts can be built headlessly (see benchmarks/bench_e2e.py).
+"""
+
+from config import get_prompt_template, PromptTemplate
+from src.context_budget import fit_history, format_turns
+from src.vectordb_utils import query_pinecone
+
+
+def _text_message(role, text):
+    return {"role": role, "content": [{"type": "text", "text": text}]}
+
+
+# --- Upwork proposal ---
+
+def proposal_context(job_description, important_points, resume_text):
+    """Fields shared by the proposal and screening prompts, including RAG matches."""
+    return {
+        "experience": query_pinecone(job_description),
+        "job_description": job_description,
+        "important_points": important_points,
+        "resume": resume_text or "(no resume provided)",
+    }
+
+
+def proposal_content(shared_context, image_parts=()):
+    """Content parts of the proposal request: the GENERATE prompt, then any images."""
+    return [{"type": "text", "text": get_prompt_template(PromptTemplate.GENERATE).format(**shared_context)}] + \
+        list(image_parts)
+
+
+def screening_context_prompt(shared_context, screening_questions):
+    """Stand-alone screening prompt, answerable without the proposal."""
+    return get_prompt_template(PromptTemplate.UPWORK_SCREENING_CONTEXT).format(
+        screening_questions=screening_questions, **shared_context,
+    )
+
+
+def screening_followup_prompt(screening_questions):
+    """Screening prompt sent as a follow-up turn after the proposal."""
+    return get_prompt_template(PromptTemplate.UPWORK_SCREENING_QUESTIONS).format(
+        screening_questions=screening_questions
+    )
+
+
+def linkedin_followup_messages(job_description, proposal):
+    prompt = get_prompt_template(PromptTemplate.LINKEDIN_FOLLOWUP).format(
+        job_description=job_description,
+        proposal=proposal,
+    )
+    return [_text_message("user", prompt)]
+
+
+# --- Upwork response (conversation) ---
+
+def build_conv_messages(context, new_client_content=None, model_type=None, summarize=None):
+    """
+    Build proper multi-turn LLM messages for follow-up conversation.
+
+    Structure:
+      1. user: system prompt with job context + original conversation history
+         (+ the rolling summary of turns that no longer fit the token budget)
+      2. assistant: first generated response
+      3. user: client's follow-up message (may include images)
+      4. assistant: our drafted reply
+      ... and so on for each follow-up exchange.
+      Last: user message with the new client message (if provided).
+
+    This gives the LLM natural turn-taking instead of one giant prompt.
+    With `summarize` (e.g. app._conv_summarizer), turns over the history budget
+    are folded into context["summary"]; the caller saves the session.
+    """
+    # First message: the system context prompt (same as initial generation)
+    system_prompt = get_prompt_template(PromptTemplate.CONVERSATION_RESPONSE).format(
+        job_description=context["job_description"],
+        cover_letter=context["cover_letter"],
+        conversation=context["conversation"],
+    )
+    screening_qa = context.get("screening_qa", "").strip()
+    if screening_qa:
+        system_prompt += f"\n\n**Screening Questions & My Answers:**\n{screening_qa}"
+    summary, window = fit_history(context, model_type, summarize)
+    if summary:
+        system_prompt += f"\n\n**Summary of Our Earlier Follow-up Messages:**\n{summary}"
+    messages = [
+        {"role": "user", "content": [{"type": "text", "text": system_prompt}]}
+    ]
+
+    # Replay the recent follow-up exchanges as proper turns
+    for entry in window:
+        if entry["role"] == "client":
+            content = []
+            if entry.get("image_parts"):
+                content.extend(entry["image_parts"])
+            content.append({"type": "text", "text": entry["text"]})
+            messages.append({"role": "user", "content": content})
+        else:  # assistant
+            messages.append({"role": "assistant", "content": [{"type": "text", "text": entry["text"]}]})
+
+    # Append the new client message if provided
+    if new_client_content is not None:
+        messages.append({"role": "user", "content": new_client_content})
+
+    return messages
+
+
+def summary_messages(previous_summary, turns):
+    """Request that folds `turns` into the rolling conversation summary."""
+    prompt = get_prompt_template(PromptTemplate.CONVERSATION_SUMMARY).format(
+        summary=previous_summary or "(none yet)",
+        turns=format_turns(turns),
+    )
+    return [_text_message("user", prompt)]
+
+
+# --- Conversation reply / 2English ---
+
+def quick_reply_messages(client_message, reply_context, tone):
+    prompt = get_prompt_template(PromptTemplate.QUICK_REPLY).format(
+        client_message=client_message,
+        reply_context=reply_context,
+        tone_instruction=tone["instruction"],
+    )
+    return [_text_message("user", prompt)]
+
+
+def english_rewrite_prompt(text, tone):
+    """The 2English user turn: rewrite instruction plus the input text."""
+    system_instruction = f"Rewrite the following text to sound natural, {tone['descriptors']}, and native-like (USA English), while preserving the original meaning."
+    return f"{system_instruction}\n\nInput Text:\n{text}"
+
+
+def english_rewrite_messages(messages, tone):
+    """
+    Copy of `messages` for the API with the helper instruction prepended to the
+    text of the last user turn; `messages` itself (used for display) is left as is.
+    """
+    api_messages = [dict(m) for m in messages]
+    if api_messages and api_messages[-1]["role"] == "user":
+        api_messages[-1]["content"] = [
+            {**item, "text": f"You are a native USA English speaker helper. Rewrite this to sound {tone['descriptors']} and native-like:\n\n{item['text']}"}
+            if item["type"] == "text" else item
+            for item in api_messages[-1]["content"]
+        ]
+    return api_messages
@@ -0,0 +1,198 @@
+"""
+Opt-in on-disk cache of complete LLM responses.
+
+Entries are keyed by sha256 over (provider, model params, normalized
+messages). Image parts are keyed by their content-addressed ref (or a hash of
+an inline data URL), and text is whitespace-normalized. Entries expire after
+a TTL and are evicted least-recently-used first once the stored text exceeds
+a byte budget. `cached_stream` replays a hit as a quick simulated stream, so
+callers render it exactly like a live response.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from os.path import join, dirname, abspath
+
+DB_PATH = join(dirname(dirname(abspath(__file__))), "response_cache.db")
+TTL_SECONDS = 24 * 60 * 60
+MAX_BYTES = 32 * 1024 * 1024
+REPLAY_CHUNK_CHARS = 24
+REPLAY_SECONDS = 0.4  # upper bound on how long a replayed hit takes to "stream"
+
+
+def _normalize_text(text):
+    return "\n".join(line.rstrip() for line in text.replace("\r\n", "\n").strip().split("\n"))
+
+
+def _normalize_part(part):
+    if part.get("type") == "text":
+        return {"type": "text", "text": _normalize_text(part["text"])}
+    if part.get("type") == "image_url":
+        url = part["image_url"]["url"]
+        return {"type": "image_url", "sha256": hashlib.sha256(url.encode("utf-8")).hexdigest()}
+    return part  # image_ref parts are already content hashes; file parts keep their names
+
+
+def normalize_messages(messages):
+    """The message list reduced to what determines the response."""
+    normalized = []
+    for message in messages:
+        content = message["content"]
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        normalized.append({"role": message["role"], "content": [_normalize_part(p) for p in content]})
+    return normalized
+
+
+def cache_key(model_type, model_params, messages):
+    payload = json.dumps(
+        {"provider": model_type, "params": model_params, "messages": normalize_messages(messages)},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed TTL + LRU cache of response texts."""
+
+    def __init__(self, path=DB_PATH, ttl=TTL_SECONDS, max_bytes=MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+        self._conn.commit()
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def get(self, key):
+        """Return the cached text for `key`, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, size, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and now - row[2] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._bytes -= row[1]
+                row = None
+            elif row:
+                self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            if row:
+                self.hits += 1
+                return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, key, text):
+        now = time.time()
+        size = len(text.encode("utf-8"))
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._bytes += size - (old[0] if old else 0)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, text, size, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, text, size, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        """Drop expired entries, then least-recently-used ones until under 90% of the budget."""
+        expired = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses WHERE created_at < ?", (now - self.ttl,)
+        ).fetchone()[0]
+        if expired:
+            self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+            self._bytes -= expired
+        if self._bytes <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        cursor = self._conn.execute("SELECT key, size FROM responses ORDER BY last_used ASC")
+        victims = []
+        for key, size in cursor:
+            if self._bytes <= target:
+                break
+            victims.append((key,))
+            self._bytes -= size
+        cursor.close()
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": entries,
+                "bytes": self._bytes,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the shared ResponseCache, opening it on first call (thread-safe)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
+
+
+def replay(text, chunk_chars=REPLAY_CHUNK_CHARS, seconds=REPLAY_SECONDS):
+    """Yield `text` in small chunks, spread over at most `seconds`."""
+    chunks = [text[i:i + chunk_chars] for i in range(0, len(text), chunk_chars)]
+    delay = seconds / len(chunks) if chunks else 0
+    for i, chunk in enumerate(chunks):
+        if i and delay:
+            time.sleep(delay)
+        yield chunk
+
+
+def cached_stream(cache, model_params, model_type, messages, open_stream, on_hit=None):
+    """
+    Yield the cached response for this request, or stream a fresh one from
+    `open_stream()` and store it once it completes. Streams abandoned part way
+    are not stored. `on_hit()` is called before a cached response is replayed.
+    """
+    key = cache_key(model_type, model_params, messages)
+    text = cache.get(key)
+    if text is not None:
+        if on_hit:
+            on_hit()
+        yield from replay(text)
+        return
+    parts = []
+    for chunk in open_stream():
+        parts.append(chunk)
+        yield chunk
+    if parts:
+        cache.put(key, "".join(parts))
@@ -0,0 +1,210 @@
+"""
+Id-keyed SQLite copy of the saved-reply CSV (fixture/info.csv).
+
+Vector matches only carry the id of the saved reply they came from (see
+`src.ingest.vector_id`). Instead of rescanning the CSV on every query, rows
+are loaded once into a small SQLite table, keyed by that id, and looked up by
+index. The table is rebuilt when the CSV's size/mtime change and its content
+hash no longer matches, or when the embedding model (part of the id) does.
+
+An FTS5 index over titles and details (porter-stemmed) is kept in step with
+the table. `search_rows` ranks rows by BM25 for the lexical half of hybrid
+retrieval and returns the same ids. Before that, it drops query words that are missing from the
+library or common in it, using document frequencies cached per word.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+from os.path import join, dirname, abspath
+
+import config
+from src.ingest import keyed_saved_replies
+
+DB_PATH = join(dirname(dirname(abspath(__file__))), "saved_replies.db")
+
+_lock = threading.Lock()
+_conn = None
+_csv_stat = None  # (path, mtime_ns, size, model) last verified against the stored hash
+_term_df = {}  # query term -> number of rows matching it, reset on rebuild
+_row_count = None
+
+MAX_QUERY_TERMS = 64
+MAX_TERM_DF = 0.25  # query terms in more than this share of rows barely move BM25; skip them
+TITLE_WEIGHT = 2.0  # BM25 column weight of the title relative to the details
+STOPWORDS = frozenset("""
+    a about above after again all also am an and any are as at be been being below between both but by can could
+    did do does doing down during each few for from further had has have having he her here hers him his how i
+    if in into is it its itself just me more most my no nor not now of off on once only or other our
+    ours out over own same she should so some such than that the their theirs them then there these they this
+    those through to too under until up very was we were what when where which while who whom why will with
+    would you your yours
+""".split())
+
+
+def _get_conn():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        columns = [c[1] for c in _conn.execute("PRAGMA table_info(rows)")]
+        if columns and "vid" not in columns:
+            # tables built when rows were looked up by row number
+            _conn.execute("DROP TABLE IF EXISTS rows_fts")
+            _conn.execute("DROP TABLE rows")
+            _conn.execute("DROP TABLE IF EXISTS meta")
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+        """)
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS rows (
+                row_no INTEGER PRIMARY KEY,
+                vid TEXT NOT NULL,
+                title TEXT NOT NULL,
+                details TEXT NOT NULL
+            )
+        """)
+        _conn.execute("CREATE INDEX IF NOT EXISTS rows_vid ON rows (vid)")
+        _conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS rows_fts USING fts5(
+                title, details, content='rows', content_rowid='row_no', tokenize='porter unicode61'
+            )
+        """)
+        if _get_meta(_conn, "fts") is None:
+            # tables built before the search index existed
+            _conn.execute("INSERT INTO rows_fts (rows_fts) VALUES ('rebuild')")
+            _conn.execute("INSERT INTO meta (key, value) VALUES ('fts', '1')")
+        _conn.commit()
+    return _conn
+
+
+def _file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _get_meta(conn, key):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _rebuild(conn, csv_path, csv_hash, model):
+    global _row_count
+    with conn:
+        conn.execute("DELETE FROM rows")
+        conn.executemany(
+            "INSERT INTO rows (vid, row_no, title, details) VALUES (?, ?, ?, ?)",
+            keyed_saved_replies(csv_path, model),
+        )
+        conn.execute("INSERT INTO rows_fts (rows_fts) VALUES ('rebuild')")
+        _term_df.clear()
+        _row_count = None
+        conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [("csv_hash", csv_hash), ("model", model)],
+        )
+
+
+def _ensure_fresh(conn, csv_path):
+    """Rebuild the table if the CSV or embedding model changed since it was last loaded."""
+    global _csv_stat
+    try:
+        st = os.stat(csv_path)
+    except FileNotFoundError:
+        return  # serve whatever was loaded last
+    model = config.ModelType.embedding.value
+    stat_key = (csv_path, st.st_mtime_ns, st.st_size, model)
+    if stat_key == _csv_stat:
+        return
+
+    csv_hash = _file_hash(csv_path)
+    if csv_hash != _get_meta(conn, "csv_hash") or model != _get_meta(conn, "model"):
+        _rebuild(conn, csv_path, csv_hash, model)
+    _csv_stat = stat_key
+
+
+def get_rows(ids, csv_path=None):
+    """
+    Return [(row_no, title, details), ...] for the given vector ids, in the
+    order requested. Duplicates and unknown ids are skipped; rows with
+    identical text share an id, which resolves to the first of them.
+    `csv_path` defaults to config.SAVED_REPLY_CSV, read at call time.
+    """
+    csv_path = csv_path or config.SAVED_REPLY_CSV
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return []
+    with _lock:
+        conn = _get_conn()
+        _ensure_fresh(conn, csv_path)
+        placeholders = ",".join("?" * len(ids))
+        found = {}
+        for vid, row_no, title, details in conn.execute(
+            f"SELECT vid, row_no, title, details FROM rows WHERE vid IN ({placeholders}) ORDER BY row_no",
+            ids,
+        ):
+            found.setdefault(vid, (row_no, title, details))
+    return [found[vid] for vid in ids if vid in found]
+
+
+def _query_terms(text):
+    """Distinct non-stopword terms of `text`, in order, quoted so FTS5 operators stay literal."""
+    terms = []
+    for word in re.findall(r"\w+", text.lower()):
+        term = f'"{word}"'
+        if word not in STOPWORDS and len(word) > 1 and term not in terms:
+            terms.append(term)
+    return terms
+
+
+def _selective_terms(conn, terms):
+    """
+    The terms that occur in the library but in at most MAX_TERM_DF of its
+    rows (the rarest few if none do), capped at MAX_QUERY_TERMS. Document
+    frequencies are cached per term until the table is rebuilt.
+    """
+    global _row_count
+    for term in terms:
+        if term not in _term_df:
+            _term_df[term] = conn.execute(
+                "SELECT COUNT(*) FROM rows_fts WHERE rows_fts MATCH ?", (term,)
+            ).fetchone()[0]
+    present = [t for t in terms if _term_df[t]]
+    if not present:
+        return []
+    if _row_count is None:
+        _row_count = conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+    selective = [t for t in present if _term_df[t] <= MAX_TERM_DF * _row_count]
+    if not selective:
+        selective = sorted(present, key=_term_df.get)[:3]
+    return sorted(selective, key=_term_df.get)[:MAX_QUERY_TERMS]
+
+
+def search_rows(text, limit=20, csv_path=None):
+    """Vector ids of the saved replies that best match `text` by BM25, best first."""
+    terms = _query_terms(text)
+    if not terms:
+        return []
+    csv_path = csv_path or config.SAVED_REPLY_CSV
+    with _lock:
+        conn = _get_conn()
+        _ensure_fresh(conn, csv_path)
+        terms = _selective_terms(conn, terms)
+        if not terms:
+            return []
+        return [
+            row[0]
+            for row in conn.execute(
+                f"SELECT rows.vid FROM rows_fts JOIN rows ON rows.row_no = rows_fts.rowid "
+                f"WHERE rows_fts MATCH ? ORDER BY bm25(rows_fts, {TITLE_WEIGHT}, 1.0) LIMIT ?",
+                (" OR ".join(terms), limit),
+            )
+        ]
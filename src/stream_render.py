@@ -0,0 +1,84 @@
+"""
+Coalesced rendering of streamed responses.
+
+Re-rendering the whole accumulated markdown on every chunk makes the UI cost
+quadratic in response length. `StreamRenderer` buffers chunks and calls
+`render(text)` at most once per `interval` seconds, or sooner once
+`max_chars` of new text are pending. It always renders the first chunk
+straight away and the complete text at the end. It also records chunk rate
+and how much of the stream's wall time went into rendering.
+"""
+
+import time
+
+RENDER_INTERVAL = 0.05
+RENDER_MAX_CHARS = 2000
+
+
+class StreamRenderer:
+    def __init__(self, render, interval=RENDER_INTERVAL, max_chars=RENDER_MAX_CHARS):
+        self.render = render
+        self.interval = interval
+        self.max_chars = max_chars
+        self.chunks = 0
+        self.renders = 0
+        self.render_seconds = 0.0
+        self._parts = []
+        self._pending = 0
+        self._started = None
+        self._last_render = None
+        self._finished = None
+
+    @property
+    def text(self):
+        return "".join(self._parts)
+
+    def feed(self, chunk):
+        if not chunk:
+            return
+        now = time.perf_counter()
+        if self._started is None:
+            self._started = now
+        self._parts.append(chunk)
+        self.chunks += 1
+        self._pending += len(chunk)
+        if (self._last_render is None or now - self._last_render >= self.interval
+                or self._pending >= self.max_chars):
+            self._render()
+
+    def _render(self):
+        start = time.perf_counter()
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        self.render(self._parts[0])
+        self._last_render = time.perf_counter()
+        self.render_seconds += self._last_render - start
+        self.renders += 1
+        self._pending = 0
+
+    def finish(self):
+        """Render whatever is still pending; returns the full text."""
+        if self._pending:
+            self._render()
+        self._finished = time.perf_counter()
+        return self.text
+
+    def stats(self):
+        end = self._finished or time.perf_counter()
+        seconds = end - self._started if self._started is not None else 0.0
+        return {
+            "chunks": self.chunks,
+            "renders": self.renders,
+            "seconds": seconds,
+            "chunks_per_sec": self.chunks / seconds if seconds else 0.0,
+            "render_seconds": self.render_seconds,
+            "render_overhead": self.render_seconds / seconds if seconds else 0.0,
+        }
+
+
+def render_stream(chunks, render, interval=RENDER_INTERVAL, max_chars=RENDER_MAX_CHARS):
+    """Feed an iterable of chunks through a StreamRenderer; returns (text, stats)."""
+    renderer = StreamRenderer(render, interval, max_chars)
+    for chunk in chunks:
+        renderer.feed(chunk)
+    return renderer.finish(), renderer.stats()
@@ -0,0 +1,200 @@
+"""
+Lightweight per-request telemetry.
+
+Instrumented code opens a span per stage:
+
+    with telemetry.span("rag.embed", model="text-embedding-3-large") as s:
+        ...
+        s.set(request_bytes=n)
+
+Each finished span is written to a local SQLite table. It records the stage,
+the model, the start time and duration, and a status: "ok", "error", or
+"cancelled" for a generator closed early. Optional fields hold time to first
+token, request/response sizes and token usage. `stage_stats()` aggregates the
+recent spans into p50/p95 per stage and model for the sidebar. Writes never
+raise into the caller, and the table is pruned to the newest MAX_ROWS spans.
+"""
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from os.path import join, dirname, abspath
+
+DB_PATH = join(dirname(dirname(abspath(__file__))), "metrics.db")
+ENABLED = True
+MAX_ROWS = 50000
+PRUNE_EVERY = 500  # inserts between retention checks
+
+FIELDS = ("ttft", "request_bytes", "response_bytes", "input_tokens", "output_tokens", "cached")
+
+_lock = threading.Lock()
+_conn = None
+_inserts = 0
+
+
+def _get_conn():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.execute("""
+            CREATE TABLE IF NOT EXISTS spans (
+                id INTEGER PRIMARY KEY,
+                stage TEXT NOT NULL,
+                model TEXT,
+                started_at REAL NOT NULL,
+                seconds REAL NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                ttft REAL,
+                request_bytes INTEGER,
+                response_bytes INTEGER,
+                input_tokens INTEGER,
+                output_tokens INTEGER,
+                cached INTEGER
+            )
+        """)
+        _conn.execute("CREATE INDEX IF NOT EXISTS idx_spans_started_at ON spans(started_at)")
+        _conn.commit()
+    return _conn
+
+
+def _record(row):
+    global _inserts
+    try:
+        with _lock:
+            conn = _get_conn()
+            conn.execute(
+                f"INSERT INTO spans (stage, model, started_at, seconds, status, error, {', '.join(FIELDS)}) "
+                f"VALUES ({', '.join('?' * (6 + len(FIELDS)))})",
+                row,
+            )
+            _inserts += 1
+            if _inserts % PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM spans WHERE id <= (SELECT MAX(id) FROM spans) - ?", (MAX_ROWS,))
+            conn.commit()
+    except sqlite3.Error as e:
+        print(f"telemetry: dropped span {row[0]}: {e}")
+
+
+class Span:
+    """One timed stage; `fields` holds the optional FIELDS columns."""
+
+    def __init__(self, stage, model=None):
+        self.stage = stage
+        self.model = model
+        self.fields = {}
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def elapsed(self):
+        return time.perf_counter() - self._start
+
+    def stream(self, chunks):
+        """Pass text chunks through, recording time to first token and response size."""
+        size = 0
+        iterator = iter(chunks)
+        while True:
+            try:
+                chunk = next(iterator)
+            except StopIteration as stop:
+                return stop.value
+            if chunk and "ttft" not in self.fields:
+                self.fields["ttft"] = self.elapsed()
+            size += len(chunk.encode("utf-8"))
+            self.fields["response_bytes"] = size
+            yield chunk
+
+    def end(self, status="ok", error=None):
+        if not ENABLED:
+            return
+        _record((
+            self.stage, self.model, self.started_at, self.elapsed(), status,
+            error, *(self.fields.get(f) for f in FIELDS),
+        ))
+
+
+@contextmanager
+def span(stage, model=None, **fields):
+    """Time the enclosed block as one span; yields the Span so fields can be added."""
+    s = Span(stage, model)
+    s.set(**fields)
+    try:
+        yield s
+    except GeneratorExit:
+        s.end("cancelled")
+        raise
+    except BaseException as e:
+        s.end("error", f"{type(e).__name__}: {e}"[:500])
+        raise
+    s.end()
+
+
+def payload_bytes(messages):
+    """Approximate request size: text plus (data) URL lengths of OpenAI-style messages."""
+    size = 0
+    for message in messages:
+        content = message["content"]
+        if isinstance(content, str):
+            size += len(content.encode("utf-8"))
+            continue
+        for part in content:
+            if part.get("type") == "text":
+                size += len(part["text"].encode("utf-8"))
+            elif part.get("type") == "image_url":
+                size += len(part["image_url"]["url"])
+    return size
+
+
+def _percentile(values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    return values[min(len(values) - 1, round(q * (len(values) - 1)))]
+
+
+def stage_stats(hours=24):
+    """
+    Per (stage, model) aggregates over the last `hours`: count, errors,
+    p50/p95 duration and time to first token (ms), and mean token usage.
+    """
+    since = time.time() - hours * 3600
+    with _lock:
+        rows = _get_conn().execute(
+            "SELECT stage, model, seconds, status, ttft, input_tokens, output_tokens "
+            "FROM spans WHERE started_at >= ? ORDER BY stage, model",
+            (since,),
+        ).fetchall()
+    groups = {}
+    for stage, model, seconds, status, ttft, input_tokens, output_tokens in rows:
+        groups.setdefault((stage, model or ""), []).append((seconds, status, ttft, input_tokens, output_tokens))
+
+    stats = []
+    for (stage, model), spans in groups.items():
+        seconds = sorted(s[0] * 1000 for s in spans)
+        ttfts = sorted(s[2] * 1000 for s in spans if s[2] is not None)
+        inputs = [s[3] for s in spans if s[3] is not None]
+        outputs = [s[4] for s in spans if s[4] is not None]
+        stats.append({
+            "stage": stage,
+            "model": model,
+            "count": len(spans),
+            "errors": sum(1 for s in spans if s[1] == "error"),
+            "p50_ms": _percentile(seconds, 0.5),
+            "p95_ms": _percentile(seconds, 0.95),
+            "ttft_p50_ms": _percentile(ttfts, 0.5) if ttfts else None,
+            "ttft_p95_ms": _percentile(ttfts, 0.95) if ttfts else None,
+            "input_tokens": round(sum(inputs) / len(inputs)) if inputs else None,
+            "output_tokens": round(sum(outputs) / len(outputs)) if outputs else None,
+        })
+    return stats
+
+
+def clear():
+    with _lock:
+        conn = _get_conn()
+        conn.execute("DELETE FROM spans")
+        conn.commit()
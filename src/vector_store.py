@@ -0,0 +1,194 @@
+"""
+In-process vector index, usable in place of a Pinecone index.
+
+A vector store here is anything exposing the subset of the Pinecone `Index`
+API the app relies on:
+
+    upsert(vectors=[{"id", "values", "metadata"}, ...])
+    query(vector=..., top_k=..., include_values=..., include_metadata=...)
+        -> {"matches": [{"id", "score", "values"?, "metadata"?}, ...]}
+    list(prefix=...) -> pages of ids
+    delete(ids=[...]) / delete(delete_all=True)
+    describe_index_stats()
+
+`LocalVectorIndex` implements it with a NumPy matrix and brute-force cosine
+search, which for a library of a few thousand saved replies answers faster
+than a network round-trip. With a `path`, vectors are kept in a `.npy`
+memmap and ids/metadata in a JSON sidecar, so the index survives restarts.
+"""
+
+import json
+import os
+import threading
+
+import numpy as np
+
+INITIAL_CAPACITY = 1024
+
+
+class LocalVectorIndex:
+    def __init__(self, dims, path=None):
+        self.dims = dims
+        self.path = path
+        self._lock = threading.Lock()
+        self._ids = []
+        self._metadata = []
+        self._positions = {}
+        self._count = 0
+        if not (path and os.path.exists(path + ".json") and self._load()):
+            self._matrix = self._allocate(INITIAL_CAPACITY)
+            self._save()  # replaces an unusable saved index, so the next start sees this empty one
+        self._norms = np.linalg.norm(self._matrix[:self._count], axis=1)
+
+    # --- persistence ---
+
+    def _allocate(self, capacity):
+        if self.path:
+            return np.lib.format.open_memmap(
+                self.path + ".npy", mode="w+", dtype=np.float32, shape=(capacity, self.dims)
+            )
+        return np.zeros((capacity, self.dims), dtype=np.float32)
+
+    def _load(self):
+        """
+        Open the saved index. Returns False, leaving this one empty, if the
+        sidecar or the matrix is missing, truncated or does not match the
+        other (e.g. a crash between writing them, or one deleted by hand).
+        """
+        try:
+            with open(self.path + ".json", "rt", encoding="utf-8") as f:
+                state = json.load(f)
+            ids = state["ids"]
+        except (OSError, ValueError, KeyError) as e:
+            return self._unusable(e)
+        if state["dims"] != self.dims:
+            raise ValueError(f"Local index at {self.path} has {state['dims']} dims, expected {self.dims}")
+        try:
+            # a read-only map fails on a short file; "r+" would zero-extend it
+            np.load(self.path + ".npy", mmap_mode="r")
+            matrix = np.load(self.path + ".npy", mmap_mode="r+")
+        except (OSError, ValueError) as e:
+            return self._unusable(e)
+        if matrix.ndim != 2 or matrix.shape[1] != self.dims or len(matrix) < len(ids):
+            return self._unusable(f"matrix of shape {matrix.shape} for {len(ids)} ids")
+        self._ids = state["ids"]
+        self._metadata = state["metadata"]
+        self._count = len(self._ids)
+        self._positions = {vid: pos for pos, vid in enumerate(self._ids)}
+        self._matrix = matrix
+        return True
+
+    def _unusable(self, reason):
+        print(f"Local index at {self.path} is unusable ({reason}); starting empty. "
+              f"Run `python upsert_pinecone.py --rebuild` to re-embed into it.")
+        return False
+
+    def _save(self):
+        if not self.path:
+            return
+        self._matrix.flush()
+        tmp = self.path + ".json.tmp"
+        with open(tmp, "wt", encoding="utf-8") as f:
+            json.dump({"dims": self.dims, "ids": self._ids, "metadata": self._metadata}, f)
+        os.replace(tmp, self.path + ".json")
+
+    def _grow(self, needed):
+        capacity = len(self._matrix)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        old = self._matrix
+        if self.path:
+            # open_memmap truncates the file, so copy out first
+            rows = np.array(old[:self._count])
+            del old, self._matrix
+            self._matrix = self._allocate(capacity)
+            self._matrix[:self._count] = rows
+        else:
+            self._matrix = self._allocate(capacity)
+            self._matrix[:self._count] = old[:self._count]
+
+    # --- Pinecone-compatible API ---
+
+    def upsert(self, vectors):
+        with self._lock:
+            new = [v for v in vectors if v["id"] not in self._positions]
+            self._grow(self._count + len(new))
+            for vec in vectors:
+                pos = self._positions.get(vec["id"])
+                if pos is None:
+                    pos = self._count
+                    self._count += 1
+                    self._positions[vec["id"]] = pos
+                    self._ids.append(vec["id"])
+                    self._metadata.append(dict(vec.get("metadata") or {}))
+                else:
+                    self._metadata[pos] = dict(vec.get("metadata") or {})
+                self._matrix[pos] = np.asarray(vec["values"], dtype=np.float32)
+            self._norms = np.linalg.norm(self._matrix[:self._count], axis=1)
+            self._save()
+        return {"upserted_count": len(vectors)}
+
+    def list(self, prefix=None, limit=100):
+        with self._lock:
+            ids = [vid for vid in self._ids if prefix is None or vid.startswith(prefix)]
+        for start in range(0, len(ids), limit):
+            yield ids[start:start + limit]
+
+    def delete(self, ids=None, delete_all=False):
+        with self._lock:
+            if delete_all:
+                ids = list(self._ids)
+            for vid in ids or []:
+                pos = self._positions.pop(vid, None)
+                if pos is None:
+                    continue
+                last = self._count - 1
+                if pos != last:
+                    # move the last row into the hole
+                    self._matrix[pos] = self._matrix[last]
+                    self._ids[pos] = self._ids[last]
+                    self._metadata[pos] = self._metadata[last]
+                    self._positions[self._ids[pos]] = pos
+                self._ids.pop()
+                self._metadata.pop()
+                self._count = last
+            self._norms = np.linalg.norm(self._matrix[:self._count], axis=1)
+            self._save()
+        return {}
+
+    def query(self, vector, top_k=5, include_values=False, include_metadata=False, **kwargs):
+        q = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            count = self._count
+            if count == 0:
+                return {"matches": []}
+            matrix = self._matrix[:count]
+            norms = self._norms
+            ids = self._ids
+            metadata = self._metadata
+            scores = (matrix @ q) / (norms * (np.linalg.norm(q) or 1.0) + 1e-12)
+            k = min(top_k, count)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            matches = []
+            for pos in top:
+                match = {"id": ids[pos], "score": float(scores[pos])}
+                if include_values:
+                    match["values"] = matrix[pos].tolist()
+                if include_metadata:
+                    match["metadata"] = dict(metadata[pos])
+                matches.append(match)
+        return {"matches": matches}
+
+    def describe_index_stats(self):
+        with self._lock:
+            count = self._count
+        return {
+            "dimension": self.dims,
+            "index_fullness": 0.0,
+            "total_vector_count": count,
+            "namespaces": {"": {"vector_count": count}},
+        }
@@ -1,109 +1,271 @@
-from langchain_openai import OpenAIEmbeddings
-from pinecone.grpc import PineconeGRPC as Pinecone
-from pinecone import ServerlessSpec
-import csv
-import uuid
 import config
 from config import get_prompt_template, PromptTemplate
-import time, os
+from src.ingest import sync_csv, SyncManifest, ProgressReport, EMBED_BATCH_SIZE, UPSERT_BATCH_SIZE, MAX_WORKERS
+from src.row_store import get_rows, search_rows
+from src import telemetry
+from src.embed_cache import EmbeddingCache, CachedEmbeddings
+import threading
+import time
 
-pc = Pinecone(api_key=config.PINECONE_API_KEY)
 dims = 3072
-spec = ServerlessSpec(
-    cloud="aws", region="us-east-1"  # us-east-1
-)
-
-# check if index already exists (it shouldn't if this is first time)
-existing_indexes = pc.list_indexes()
-
-if config.PINECONE_INDEX_NAME not in [item["name"] for item in existing_indexes]:
-    # if does not exist, create index
-    print("creating index on pinecone...")
-    pc.create_index(
-        name=config.PINECONE_INDEX_NAME,
-        dimension=dims,  # dimensionality of embed 3
-        metric='cosine',
-        spec=spec
+
+RRF_K = 60  # rank offset of reciprocal rank fusion; larger flattens the top ranks
+RRF_CANDIDATES = 20  # per-retriever depth fed into the fusion
+RRF_WEIGHTS = (1.0, 1.0)  # (dense, lexical) multipliers of each list's 1 / (k + rank)
+
+def _connect_pinecone():
+    from pinecone.grpc import PineconeGRPC as Pinecone
+    from pinecone import ServerlessSpec
+
+    pc = Pinecone(api_key=config.PINECONE_API_KEY)
+    spec = ServerlessSpec(
+        cloud="aws", region="us-east-1"  # us-east-1
     )
-    # wait for index to be initialized
-    while not pc.describe_index(config.PINECONE_INDEX_NAME).status['ready']:
-        time.sleep(1)
-else:
-    print(f"Index with name '{config.PINECONE_INDEX_NAME}' already exists.")
-    # user_input = input("Would you like to delete and recreate the index? (y/n): ").lower()
-    # if user_input == 'y':
-    #     print(f"Deleting index '{config.PINECONE_INDEX_NAME}'...")
-    #     pc.delete_index(config.PINECONE_INDEX_NAME)
-    #     print("Creating new index...")
-    #     pc.create_index(
-    #         name=config.PINECONE_INDEX_NAME,
-    #         dimension=dims,
-    #         metric='cosine',
-    #         spec=spec
-    #     )
-    #     while not pc.describe_index(config.PINECONE_INDEX_NAME).status['ready']:
-    #         time.sleep(1)
-    #     print("Index recreated successfully!")
-    # else:
-    #     print("Using existing index.")
-
-# connect to index
-index = pc.Index(config.PINECONE_INDEX_NAME)
-print("index status:")
-print(index.describe_index_stats())
-
-embed_model = OpenAIEmbeddings(
-    model=config.ModelType.embedding,
-    openai_api_key=config.OPENAI_API_KEY
-)
+
+    # check if index already exists (it shouldn't if this is first time)
+    existing_indexes = pc.list_indexes()
+
+    if config.PINECONE_INDEX_NAME not in [item["name"] for item in existing_indexes]:
+        # if does not exist, create index
+        print("creating index on pinecone...")
+        pc.create_index(
+            name=config.PINECONE_INDEX_NAME,
+            dimension=dims,  # dimensionality of embed 3
+            metric='cosine',
+            spec=spec
+        )
+        # wait for index to be initialized
+        while not pc.describe_index(config.PINECONE_INDEX_NAME).status['ready']:
+            time.sleep(1)
+    else:
+        print(f"Index with name '{config.PINECONE_INDEX_NAME}' already exists.")
+        # user_input = input("Would you like to delete and recreate the index? (y/n): ").lower()
+        # if user_input == 'y':
+        #     print(f"Deleting index '{config.PINECONE_INDEX_NAME}'...")
+        #     pc.delete_index(config.PINECONE_INDEX_NAME)
+        #     print("Creating new index...")
+        #     pc.create_index(
+        #         name=config.PINECONE_INDEX_NAME,
+        #         dimension=dims,
+        #         metric='cosine',
+        #         spec=spec
+        #     )
+        #     while not pc.describe_index(config.PINECONE_INDEX_NAME).status['ready']:
+        #         time.sleep(1)
+        #     print("Index recreated successfully!")
+        # else:
+        #     print("Using existing index.")
+
+    # connect to index
+    return pc.Index(config.PINECONE_INDEX_NAME)
+
+def _open_local_index():
+    from src.vector_store import LocalVectorIndex
+    return LocalVectorIndex(dims, path=config.LOCAL_INDEX_PATH)
+
+VECTOR_BACKENDS = {
+    "pinecone": _connect_pinecone,
+    "local": _open_local_index,
+}
+
+def _open_index():
+    try:
+        open_backend = VECTOR_BACKENDS[config.VECTOR_BACKEND]
+    except KeyError:
+        raise ValueError(
+            f"Unknown VECTOR_BACKEND '{config.VECTOR_BACKEND}', expected one of {sorted(VECTOR_BACKENDS)}"
+        )
+    return open_backend()
+
+# Clients are created on first use rather than at import, so importing this
+# module (app.py does at startup) costs no network round-trips.
+_index = None
+_index_lock = threading.Lock()
+_embed_model = None
+_embed_lock = threading.Lock()
+_warmup_thread = None
+
+def get_index():
+    """Return the vector index, connecting on first call (thread-safe)."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                idx = _open_index()
+                print("index status:")
+                print(idx.describe_index_stats())
+                _index = idx
+    return _index
+
+def get_embed_model():
+    """Return the cached embedding model, building it on first call (thread-safe)."""
+    global _embed_model
+    if _embed_model is None:
+        with _embed_lock:
+            if _embed_model is None:
+                from langchain_openai import OpenAIEmbeddings
+                # query and document embeddings both go through the on-disk cache
+                _embed_model = CachedEmbeddings(
+                    OpenAIEmbeddings(
+                        model=config.ModelType.embedding,
+                        openai_api_key=config.OPENAI_API_KEY
+                    ),
+                    EmbeddingCache(),
+                    config.ModelType.embedding.value,
+                )
+    return _embed_model
+
+def use_backends(index=None, embed_model=None):
+    """Replace the index and/or embedding model singletons (e.g. with src.fakes stand-ins)."""
+    global _index, _embed_model
+    if index is not None:
+        with _index_lock:
+            _index = index
+    if embed_model is not None:
+        with _embed_lock:
+            _embed_model = embed_model
+
+def embedding_cache_stats():
+    """Hit/miss counters and size of the query/document embedding cache."""
+    return get_embed_model().cache.stats()
+
+def _warm_up():
+    for init in (get_embed_model, get_index):
+        try:
+            init()
+        except Exception as e:
+            print(f"Vector DB warm-up failed in {init.__name__}: {e}")
+
+def warm_up():
+    """Start connecting in a background thread; safe to call on every rerun."""
+    global _warmup_thread
+    if _warmup_thread is None:
+        with _index_lock:
+            if _warmup_thread is None:
+                _warmup_thread = threading.Thread(target=_warm_up, name="vectordb-warmup", daemon=True)
+                _warmup_thread.start()
+    return _warmup_thread
+
+def __getattr__(name):
+    # keep `from src.vectordb_utils import index, embed_model` working
+    if name == "index":
+        return get_index()
+    if name == "embed_model":
+        return get_embed_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _sync_target():
+    """Manifest key of the configured index."""
+    if config.VECTOR_BACKEND == "local":
+        return f"local:{config.LOCAL_INDEX_PATH}"
+    return f"{config.VECTOR_BACKEND}:{config.PINECONE_INDEX_NAME}"
 
 # embed and index all our our data!
-def import_csv_to_vector(csv_file_path):
-    with open(csv_file_path, 'r') as file:
-        reader = csv.reader(file)
-        next(reader)  # Skip header
-        id = 0
-        
-        for row in reader:
-            id = id + 1
-            embedding_id = str(uuid.uuid4())
-            vector = [{
-                'id': embedding_id,
-                'values':embed_model.embed_documents([get_prompt_template(PromptTemplate.SAVED_REPLY).format(title=row[3], details=row[4])])[0],
-                'metadata': {
-                    'id': id
-                },
-            }]
-            index.upsert(vectors=vector)
-            print(f"{id}: done")
-        
-    print("CSV data imported successfully into pinecone vector database.")
+def import_csv_to_vector(csv_file_path,
+                         batch_size=EMBED_BATCH_SIZE,
+                         upsert_batch_size=UPSERT_BATCH_SIZE,
+                         max_workers=MAX_WORKERS,
+                         rebuild=False):
+    """
+    Sync the CSV into the index: only new or edited rows are embedded and
+    removed rows are deleted; rows that merely moved cost nothing. An
+    interrupted sync picks up where it stopped. With `rebuild`, the index is
+    emptied and every row re-embedded.
+    """
+    index = get_index()
+    manifest = SyncManifest(_sync_target())
+    try:
+        previous = manifest.checkpoint()
+        if previous and previous["status"] == "running" and not rebuild:
+            print(
+                f"Resuming an interrupted sync: {previous['rows_done']} rows already embedded "
+                f"(all rows up to {previous['last_row']} committed)."
+            )
+        stats = sync_csv(
+            csv_file_path, get_embed_model(), index, manifest,
+            batch_size=batch_size,
+            upsert_batch_size=upsert_batch_size,
+            max_workers=max_workers,
+            on_progress=ProgressReport(),
+            model_name=config.ModelType.embedding.value,
+            rebuild=rebuild,
+        )
+    finally:
+        manifest.close()
+    if stats["recovered"]:
+        print(f"No local manifest for this index; recovered {stats['recovered']} ids from the index.")
+    print(
+        f"CSV data synced into vector database in {stats['seconds']:.1f}s: "
+        f"{stats['added']} added ({stats['rows_per_sec']:.1f} rows/sec), {stats['moved']} moved, "
+        f"{stats['deleted']} deleted, {stats['unchanged']} unchanged, {stats['retries']} retries."
+    )
+    return stats
 
-def format_rag_contexts(matches: list):
-    contexts = []
-    ids = []
-    for x in matches:
-        ids.append(x['metadata']['id'] + 1)
-    with open(os.path.join("fixture", "info.csv"), 'r') as file:
-        reader = csv.reader(file)
-        next(reader)
-        for index, row in enumerate(reader, start = 2):
-            if index in ids:
-                text = get_prompt_template(PromptTemplate.SAVED_REPLY).format(title=row[3], details=row[4])
-                contexts.append(text)
-    context_str = "\n---\n".join(contexts)
+def _format_rows(ids):
+    with telemetry.span("rag.format") as span:
+        template = get_prompt_template(PromptTemplate.SAVED_REPLY)
+        contexts = [
+            template.format(title=title, details=details)
+            for _, title, details in get_rows(ids)
+        ]
+        context_str = "\n---\n".join(contexts)
+        span.set(response_bytes=len(context_str.encode("utf-8")))
     # print(context_str)
     return context_str
 
-def query_pinecone(query: str, top_k = 5):
-    #query pinecone and return list of records
-    xq = embed_model.embed_documents([query])
+def format_rag_contexts(matches: list):
+    # keep the ranking order the index returned
+    return _format_rows([x['id'] for x in matches])
 
-    # initialize the vector store object
-    xc = index.query(
-        vector=xq[0], top_k=top_k, include_values=True, include_metadata=True
-    )
+def reciprocal_rank_fusion(rankings, k=RRF_K, weights=None):
+    """
+    Merge ranked lists of ids by sum(weight / (k + rank)); `weights` pairs up
+    with `rankings` (default 1.0 each). Ties keep the earlier list's order.
+    """
+    if weights is None:
+        weights = [1.0] * len(rankings)
+    scores = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, item in enumerate(dict.fromkeys(ranking), start=1):
+            scores[item] = scores.get(item, 0.0) + weight / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+def dense_rows(query: str, top_k: int):
+    """Ids of the nearest saved replies in the vector index."""
+    with telemetry.span("rag.embed", model=config.ModelType.embedding.value,
+                        request_bytes=len(query.encode("utf-8"))):
+        xq = get_embed_model().embed_documents([query])
+
+    with telemetry.span("rag.index"):
+        xc = get_index().query(
+            vector=xq[0], top_k=top_k, include_values=False, include_metadata=False
+        )
+    return [x['id'] for x in xc["matches"]]
+
+def lexical_rows(query: str, top_k: int):
+    """Ids of the best BM25 matches in the local full-text index."""
+    with telemetry.span("rag.lexical"):
+        return search_rows(query, limit=top_k)
 
-    context_str = format_rag_contexts(xc["matches"])
+def retrieve(query: str, top_k=5, mode="hybrid"):
+    """
+    Ranked saved-reply vector ids for `query` (row_store.get_rows resolves
+    them). `mode` is "dense", "lexical" or "hybrid": RRF, weighted by
+    RRF_WEIGHTS, over the top RRF_CANDIDATES of each.
+    """
+    if mode == "dense":
+        return dense_rows(query, top_k)
+    if mode == "lexical":
+        return lexical_rows(query, top_k)
+    if mode != "hybrid":
+        raise ValueError(f"Unknown retrieval mode '{mode}', expected 'dense', 'lexical' or 'hybrid'")
+    rankings = [dense_rows(query, RRF_CANDIDATES), lexical_rows(query, RRF_CANDIDATES)]
+    return reciprocal_rank_fusion(rankings, weights=RRF_WEIGHTS)[:top_k]
+
+def query_pinecone(query: str, top_k = 5):
+    #query pinecone and return list of records
+    with telemetry.span("rag.query_pinecone"):
+        ids = retrieve(query, top_k, config.RETRIEVAL_MODE)
+        context_str = _format_rows(ids)
     # print(context_str)
     return context_str
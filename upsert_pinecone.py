@@ -1,19 +1,26 @@
+import argparse
+
 from dotenv import load_dotenv
-import os
-from src.vectordb_utils import import_csv_to_vector, index
+import config
+from src.vectordb_utils import import_csv_to_vector, get_index
 
 # Load environment variables at the start
 load_dotenv()
 
 def main():
+    parser = argparse.ArgumentParser(description="Sync the saved-reply CSV into the vector database.")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="empty the index and re-embed every row instead of syncing changes")
+    args = parser.parse_args()
     try:
         # Import different types of data into vector database
-        import_csv_to_vector(os.path.join("fixture", "info.csv"))
+        import_csv_to_vector(config.SAVED_REPLY_CSV, rebuild=args.rebuild)
         # Print index statistics
         print("Vector Database Statistics:")
-        print(index.describe_index_stats())
+        print(get_index().describe_index_stats())
     except Exception as e:
         print(f"An error occurred: {str(e)}")
+        print("Rows that were already upserted are recorded; run again to resume.")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file